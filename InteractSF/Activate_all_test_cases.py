@@ -25,20 +25,24 @@ from utils.db_utils import create_session
 from config.config import TEST_SCRIPTS_TABLE
 
 
-def activate_all_test_cases():
-    session = None
+def activate_all_test_cases(session=None):
+    """Activate every test case. Uses `session` when given (left open), else its own. Returns True on success."""
+    own_session = session is None
     try:
-        session = create_session()
+        if own_session:
+            session = create_session()
         query = f"""
         UPDATE {TEST_SCRIPTS_TABLE}
         SET ACTIVE_FLAG = 'Y'
         """
         session.sql(query).collect()
         print(f"✅ All test cases in {TEST_SCRIPTS_TABLE} have been activated.")
+        return True
     except Exception as e:
         print(f"❌ Failed to activate test cases: {e}")
+        return False
     finally:
-        if session:
+        if own_session and session:
             session.close()
             print("🔒 Snowflake session closed.")
 
@@ -24,21 +24,25 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from utils.db_utils import create_session
 from config.config import TEST_SCRIPTS_TABLE
 
-def clear_scripts():
-    session = None
+def clear_scripts(session=None):
+    """Truncate TEST_SCRIPTS. Uses `session` when given (left open), else its own. Returns True on success."""
+    own_session = session is None
     try:
-        session = create_session()
+        if own_session:
+            session = create_session()
 
         query = f"TRUNCATE {TEST_SCRIPTS_TABLE}"
         print(f"▶ Executing: {query}")
         session.sql(query).collect()
 
         print(f"✅ Table {TEST_SCRIPTS_TABLE} has been truncated.")
+        return True
 
     except Exception as e:
         print(f"❌ Failed to truncate table {TEST_SCRIPTS_TABLE}: {e}")
+        return False
     finally:
-        if session:
+        if own_session and session:
             session.close()
             print("🔒 Snowflake session closed.")
 
@@ -2,73 +2,86 @@
 Script Name: load_scripts_sf_append.py
 
 Description:
-This script reads test case data from a CSV file (scripts.csv) and appends it into the TEST_SCRIPTS table
-in Snowflake. The first row in the CSV is treated as the header and must match the column names in the target table.
+This script loads test case data from a CSV file (scripts.csv) into the TEST_SCRIPTS table in Snowflake.
+The first row in the CSV is treated as the header and names the TEST_SCRIPTS columns it provides (TS_ID required).
+Loading is an upsert by TS_ID: new test cases are inserted, existing ones are updated, and loading the same file
+again changes nothing.
 
 Key Features:
-- Appends data using Snowpark DataFrame.
-- Displays the number of rows being uploaded.
+- Streams the CSV into compressed chunk files, so large catalogs are never held in memory.
+- Uploads the chunks with one PUT and bulk loads them with COPY INTO a temporary table.
+- MERGEs into TEST_SCRIPTS by TS_ID (the last row wins when the CSV repeats a TS_ID).
+- Displays the number of rows read, inserted and updated.
 - Automatically uses the Snowflake connection defined in 'connection.json'.
 
 Usage:
 Place 'scripts.csv' inside the same directory as this script and run:
 > python InteractSF/load_scripts_sf_append.py
+> python InteractSF/load_scripts_sf_append.py --csv path/to/catalog.csv
 
 Configuration:
 - Table name is loaded from 'config.py' as TEST_SCRIPTS_TABLE.
+- Chunk size and load stage are loaded from 'config.py' as CATALOG_LOAD_CHUNK_ROWS and CATALOG_LOAD_STAGE.
 - Connection info is pulled from 'config/connection.json'.
 
 Note:
-Ensure that the columns in 'scripts.csv' exactly match the structure of TEST_SCRIPTS table.
+Ensure that the CSV column names exist in the TEST_SCRIPTS table.
 
 Author: Prem Oswal
 """
 
 
+import argparse
 import sys
 import os
-import pandas as pd
+import time
 
 # Add parent path to access shared modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from utils.db_utils import create_session
+from services.catalog_loader import load_catalog_csv
 from config.config import TEST_SCRIPTS_TABLE
 
-def load_scripts_to_snowflake():
-    session = None
+def load_scripts_to_snowflake(session=None, csv_path=None):
+    """
+    Upsert a scripts CSV (default: scripts.csv next to this script) into TEST_SCRIPTS by TS_ID.
+
+    Uses `session` when given (left open), else its own. Returns True on success.
+    """
+    own_session = session is None
     try:
         # Setup paths
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        csv_path = os.path.join(current_dir, 'scripts.csv')
-
-        # Read CSV using pandas
-        print(f"📄 Reading CSV file: {csv_path}")
-        df = pd.read_csv(csv_path)
-        row_count = len(df)
-        print(f"🔢 Total rows to append: {row_count}")
+        if csv_path is None:
+            current_dir = os.path.dirname(os.path.abspath(__file__))
+            csv_path = os.path.join(current_dir, 'scripts.csv')
 
-        if row_count == 0:
-            print("⚠️ No rows found in CSV. Skipping upload.")
-            return
+        print(f"📄 Loading CSV file: {csv_path}")
+        start = time.perf_counter()
 
         # Create Snowflake session
-        session = create_session()
+        if own_session:
+            session = create_session()
 
-        # Upload as a Snowpark DataFrame
-        snowpark_df = session.create_dataframe(df)
-
-        # Append to existing table
-        snowpark_df.write.mode("append").save_as_table(TEST_SCRIPTS_TABLE)
+        summary = load_catalog_csv(session, csv_path)
+        if summary["rows"] == 0:
+            print("⚠️ No rows found in CSV. Skipping upload.")
+            return True
 
-        print(f"✅ Successfully appended {row_count} rows to Snowflake table: {TEST_SCRIPTS_TABLE}")
+        print(f"🔢 Rows read: {summary['rows']} ({summary['distinct']} distinct TS_IDs, {summary['files']} file(s))")
+        print(f"✅ Loaded into {TEST_SCRIPTS_TABLE} in {time.perf_counter() - start:.1f}s: "
+              f"{summary['inserted']} inserted, {summary['updated']} updated")
+        return True
 
     except Exception as e:
         print(f"❌ Failed to load data: {e}")
+        return False
     finally:
-        if session:
+        if own_session and session:
             session.close()
             print("🔒 Snowflake session closed.")
 
 if __name__ == "__main__":
-    load_scripts_to_snowflake()
+    parser = argparse.ArgumentParser(description="Upsert a test case CSV into TEST_SCRIPTS by TS_ID.")
+    parser.add_argument("--csv", help="CSV file to load (default: scripts.csv next to this script)")
+    load_scripts_to_snowflake(csv_path=parser.parse_args().csv)
@@ -0,0 +1,69 @@
+"""
+Script Name: regenerate_reports.py
+
+Description:
+This script rebuilds PDF test reports on demand from the rows already stored in the TEST_LOGS table.
+Use it after a run executed with --report-mode none or failures when a report is needed after all.
+
+Usage:
+Run this script from the CLI using Python:
+> python InteractSF/regenerate_reports.py --run-id CGDF_12
+> python InteractSF/regenerate_reports.py --ts-id OQ-FR-CGDF-SALES_DATA-04-ORDERS-Count --upload
+
+Options:
+- --run-id   : Rebuild the reports of every test in this RUN_ID
+- --ts-id    : Rebuild the report of this TS_ID (latest run unless --run-id is also given)
+- --output   : Local folder for the PDFs (default: REPORT_OUTPUT_DIR from config.py)
+- --upload   : Also put the reports on the TEST_CASE_RESULTS stage
+
+Configuration:
+- Snowflake connection settings are loaded from 'config/connection.json'.
+- Table and stage names are loaded from 'config.py'.
+"""
+
+import argparse
+import sys
+import os
+
+# Add root path to access shared modules
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.db_utils import create_session
+from services.report_regenerator import regenerate_reports
+from config.config import REPORT_OUTPUT_DIR
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild PDF test reports from TEST_LOGS.")
+    parser.add_argument("--run-id", help="RUN_ID whose reports are rebuilt")
+    parser.add_argument("--ts-id", help="TS_ID whose report is rebuilt")
+    parser.add_argument("--output", default=REPORT_OUTPUT_DIR, help="Local folder for the PDFs")
+    parser.add_argument("--upload", action="store_true", help="Also upload the reports to the results stage")
+    args = parser.parse_args()
+
+    if not args.run_id and not args.ts_id:
+        parser.error("one of --run-id or --ts-id is required")
+
+    regenerate(None, args.run_id, args.ts_id, args.output, args.upload)
+
+def regenerate(session, run_id=None, ts_id=None, output=REPORT_OUTPUT_DIR, upload=False):
+    """Rebuild reports from TEST_LOGS. Uses `session` when given (left open), else its own. Returns True on success."""
+    own_session = session is None
+    try:
+        if own_session:
+            session = create_session()
+        written = regenerate_reports(session, run_id, ts_id, output, upload)
+        if not written:
+            print("⚠️ No matching rows found in TEST_LOGS.")
+            return True
+        print(f"✅ Regenerated {len(written)} report(s) in {output}")
+        return True
+    except Exception as e:
+        print(f"❌ Failed to regenerate reports: {e}")
+        return False
+    finally:
+        if own_session and session:
+            session.close()
+            print("🔒 Snowflake session closed.")
+
+if __name__ == "__main__":
+    main()
@@ -38,10 +38,12 @@ from config.config import (
     TEST_CASE_RESULTS_STAGE
 )
 
-def reset_utility_execution():
-    session = None
+def reset_utility_execution(session=None):
+    """Reset logs, flags, run numbers and stages. Uses `session` when given (left open), else its own. Returns True on success."""
+    own_session = session is None
     try:
-        session = create_session()
+        if own_session:
+            session = create_session()
 
         queries = [
             f"TRUNCATE {TEST_LOGS_TABLE}",
@@ -56,11 +58,13 @@ def reset_utility_execution():
             session.sql(q).collect()
 
         print("✅ Utility execution has been successfully reset.")
+        return True
 
     except Exception as e:
         print(f"❌ Failed to reset utility execution: {e}")
+        return False
     finally:
-        if session:
+        if own_session and session:
             session.close()
             print("🔒 Snowflake session closed.")
 
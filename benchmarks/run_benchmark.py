@@ -0,0 +1,275 @@
+"""
+Script Name: run_benchmark.py
+
+Description:
+This script benchmarks the whole test execution pipeline (main.py) offline. Each catalog size runs
+main.main() in a fresh process against StandInSession (benchmarks/stand_in_session.py), which answers
+the pipeline's SQL from synthetic count and data checks with a fixed simulated latency per round trip.
+It reports throughput, latency percentiles per pipeline stage and per validation type, and peak memory,
+and saves everything as JSON so runs of different commits can be compared.
+
+Usage:
+Run this script from the CLI using Python:
+> python benchmarks/run_benchmark.py
+> python benchmarks/run_benchmark.py --sizes 100 1000 --latency-ms 5 --report-mode none
+> python benchmarks/run_benchmark.py --compare benchmarks/results/benchmark_<timestamp>_<commit>.json
+
+Options:
+- --sizes                : Catalog sizes to run (default: 100 1000 10000)
+- --count-mismatch-rate  : Share of tables whose target row count differs (default: 0.05)
+- --data-mismatch-rate   : Share of tables whose target rows differ at equal count (default: 0.05)
+- --latency-ms           : Simulated round trip latency of every statement and PUT (default: 2)
+- --workers              : Passed to main.py --workers (default: MAX_WORKERS from config.py)
+- --report-mode          : Passed to main.py --report-mode (default: failures)
+- --seed                 : Catalog random seed (default: 7)
+- --trace-memory         : Also measure the peak of Python allocations with tracemalloc (slows the run)
+- --output               : JSON result file (default: benchmarks/results/benchmark_<timestamp>_<commit>.json)
+- --compare              : Earlier JSON result file to compare against
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+# Add root path to access shared modules
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT_DIR)
+
+from config.config import MAX_WORKERS, REPORT_MODES
+
+DEFAULT_SIZES = (100, 1000, 10000)
+RESULTS_DIR = os.path.join(ROOT_DIR, "benchmarks", "results")
+
+# Pipeline stage of every statement kind recorded by StandInSession
+STAGES = {
+    "fetch": ("fetch_catalog",),
+    "run_ids": ("allocate_run_ids",),
+    "baselines": ("refresh_baselines",),
+    "scheduling": ("execution_history",),
+    "count_prefetch": ("table_metadata", "count_batch"),
+    "execution": ("count_query", "count_script_lookup", "fingerprint", "bucket_diff", "diff_materialize",
+                  "diff_counts", "diff_unload", "diff_drop", "column_diff"),
+    "logging": ("log_insert", "deactivate"),
+    "upload": ("stage_put", "stage_copy", "stage_remove"),
+}
+
+def percentiles(values):
+    """Summarize durations in seconds as count and p50/p90/p99/max in milliseconds."""
+    if not values:
+        return {"count": 0}
+    values = sorted(values)
+
+    def at(share):
+        return round(values[min(len(values) - 1, int(share * len(values)))] * 1000, 3)
+
+    return {"count": len(values), "p50_ms": at(0.50), "p90_ms": at(0.90), "p99_ms": at(0.99),
+            "max_ms": round(values[-1] * 1000, 3)}
+
+@contextlib.contextmanager
+def patched(module, name, value):
+    """Temporarily replace a module attribute."""
+    original = getattr(module, name)
+    setattr(module, name, value)
+    try:
+        yield
+    finally:
+        setattr(module, name, original)
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None where the resource module is unavailable (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def summarize_stages(statements):
+    """Group recorded statements by pipeline stage: wall-clock span plus statement latency percentiles."""
+    by_kind = defaultdict(list)
+    for kind, _, start, duration in statements:
+        by_kind[kind].append((start, duration))
+
+    stages = {}
+    for stage, kinds in STAGES.items():
+        timings = [timing for kind in kinds for timing in by_kind.get(kind, [])]
+        if not timings:
+            continue
+        span = max(start + duration for start, duration in timings) - min(start for start, _ in timings)
+        stages[stage] = {"span_s": round(span, 3), **percentiles([duration for _, duration in timings])}
+    unknown = sorted(set(by_kind) - {kind for kinds in STAGES.values() for kind in kinds})
+    for kind in unknown:
+        stages[kind] = percentiles([duration for _, duration in by_kind[kind]])
+    return stages
+
+def run_size(size, options):
+    """
+    Run main.main() once against a synthetic catalog of `size` tests (executed in a fresh process).
+
+    Returns:
+        dict: Throughput, status counts, stage and test latency percentiles and peak memory of the run
+    """
+    import tracemalloc
+    import main as pipeline
+    import services.parallel_executor as parallel_executor
+    import utils.db_utils as db_utils
+    from benchmarks.stand_in_session import StandInSession, build_synthetic_catalog
+
+    warehouse = build_synthetic_catalog(
+        size, options["count_mismatch_rate"], options["data_mismatch_rate"],
+        seed=options["seed"], latency=options["latency_ms"] / 1000
+    )
+
+    test_latencies = defaultdict(list)
+    statuses = defaultdict(int)
+    execute_test_case = parallel_executor.execute_test_case
+
+    def timed_execute_test_case(session, test_case, *args, **kwargs):
+        start = time.perf_counter()
+        status = "Error"
+        try:
+            status = execute_test_case(session, test_case, *args, **kwargs)
+            return status
+        finally:
+            test_latencies[test_case.validation_type].append(time.perf_counter() - start)
+            statuses[status] += 1
+
+    def create_stand_in_session():
+        return StandInSession(warehouse)
+
+    # Synthetic RUN_IDs repeat across benchmark runs, so they must not append to each other's checkpoint journals
+    argv = ["main.py", "--workers", str(options["workers"]), "--report-mode", options["report_mode"],
+            "--no-checkpoint"]
+    if options["trace_memory"]:
+        tracemalloc.start()
+    with open(os.devnull, "w") as devnull, \
+            patched(sys, "argv", argv), \
+            patched(db_utils, "create_session", create_stand_in_session), \
+            patched(pipeline, "create_session", create_stand_in_session), \
+            patched(parallel_executor, "execute_test_case", timed_execute_test_case), \
+            contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+        start = time.perf_counter()
+        pipeline.main()
+        wall_time = time.perf_counter() - start
+    traced_peak = tracemalloc.get_traced_memory()[1] if options["trace_memory"] else None
+    tracemalloc.stop()
+
+    executed = sum(statuses.values())
+    return {
+        "size": size,
+        "wall_time_s": round(wall_time, 3),
+        "throughput_tests_per_s": round(executed / wall_time, 2) if wall_time else None,
+        "statuses": dict(statuses),
+        "statements": len(warehouse.statements),
+        "uploaded_files": warehouse.uploaded_files,
+        "uploaded_mb": round(warehouse.uploaded_bytes / (1024 * 1024), 2),
+        "stages": summarize_stages(warehouse.statements),
+        "tests": {validation_type: percentiles(values) for validation_type, values in test_latencies.items()},
+        "peak_rss_mb": peak_rss_mb(),
+        "peak_traced_mb": round(traced_peak / (1024 * 1024), 1) if traced_peak is not None else None,
+    }
+
+def current_commit():
+    """Short hash of the checked out commit (with a -dirty suffix for local changes), or 'unknown'."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT_DIR,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return f"{commit}-dirty" if dirty else commit
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def print_run(run):
+    """Print the headline numbers of one catalog size."""
+    print(f"\n{run['size']} tests: {run['wall_time_s']}s, {run['throughput_tests_per_s']} tests/s, "
+          f"peak RSS {run['peak_rss_mb']} MB, statuses {run['statuses']}")
+    for name, stats in {**run["stages"], **run["tests"]}.items():
+        if stats.get("count"):
+            span = f"span {stats['span_s']}s, " if "span_s" in stats else ""
+            print(f"  {name:<16} {span}n={stats['count']} p50 {stats['p50_ms']}ms "
+                  f"p90 {stats['p90_ms']}ms p99 {stats['p99_ms']}ms")
+
+def compare_results(baseline, current):
+    """Print throughput and per-test latency changes of `current` against an earlier result file."""
+    print(f"\nCompared with {baseline['commit']} ({baseline['created']}):")
+    baseline_runs = {run["size"]: run for run in baseline["runs"]}
+    for run in current["runs"]:
+        previous = baseline_runs.get(run["size"])
+        if previous is None or not previous.get("throughput_tests_per_s"):
+            continue
+        change = (run["throughput_tests_per_s"] / previous["throughput_tests_per_s"] - 1) * 100
+        print(f"  {run['size']} tests: throughput {previous['throughput_tests_per_s']} -> "
+              f"{run['throughput_tests_per_s']} tests/s ({change:+.1f}%)")
+        for validation_type, stats in run["tests"].items():
+            before = previous["tests"].get(validation_type, {})
+            if before.get("count") and stats.get("count"):
+                print(f"    {validation_type}: p50 {before['p50_ms']} -> {stats['p50_ms']}ms, "
+                      f"p99 {before['p99_ms']} -> {stats['p99_ms']}ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the test execution pipeline against a stand-in session.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="Catalog sizes to run")
+    parser.add_argument("--count-mismatch-rate", type=float, default=0.05, help="Share of tables with differing counts")
+    parser.add_argument("--data-mismatch-rate", type=float, default=0.05, help="Share of tables with differing rows")
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="Simulated latency per round trip")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="Worker count passed to main.py")
+    parser.add_argument("--report-mode", choices=REPORT_MODES, default="failures", help="Report mode passed to main.py")
+    parser.add_argument("--seed", type=int, default=7, help="Catalog random seed")
+    parser.add_argument("--trace-memory", action="store_true", help="Measure peak Python allocations with tracemalloc")
+    parser.add_argument("--output", help="JSON result file")
+    parser.add_argument("--compare", help="Earlier JSON result file to compare against")
+    args = parser.parse_args()
+
+    options = {
+        "count_mismatch_rate": args.count_mismatch_rate,
+        "data_mismatch_rate": args.data_mismatch_rate,
+        "latency_ms": args.latency_ms,
+        "workers": args.workers,
+        "report_mode": args.report_mode,
+        "seed": args.seed,
+        "trace_memory": args.trace_memory,
+    }
+    commit = current_commit()
+    results = {
+        "commit": commit,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "options": options,
+        "runs": [],
+    }
+
+    for size in args.sizes:
+        print(f"Running {size} tests...")
+        # A fresh process per size keeps the run-wide singletons and the peak memory of each run separate
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            run = executor.submit(run_size, size, options).result()
+        results["runs"].append(run)
+        print_run(run)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{commit}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✅ Results saved to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare_results(json.load(f), results)
+
+if __name__ == "__main__":
+    main()
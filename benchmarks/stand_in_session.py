@@ -0,0 +1,368 @@
+"""
+Offline stand-in for the Snowpark Session used by the benchmark suite.
+
+Snowpark's local testing mode does not execute `session.sql(...)`, which is
+how every service of this utility talks to Snowflake. StandInSession answers
+exactly the statements the pipeline issues instead, from a synthetic
+warehouse of tables, and can add a fixed latency per round trip so network
+bound behaviour (batching, pooling, parallelism) shows up in the numbers.
+Unknown statements raise, so a pipeline change that introduces new SQL is
+noticed instead of being silently answered.
+"""
+import glob
+import hashlib
+import math
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict, namedtuple
+
+import pandas as pd
+from snowflake.snowpark import Row
+
+from config.config import TEST_SCRIPTS_TABLE, TEST_LOGS_TABLE, RUN_ID_TRACKER_TABLE
+
+QUALIFIED_TABLE_PATTERN = re.compile(r"\bFROM\s+([A-Z_][\w$]*\.[A-Z_][\w$]*\.[A-Z_][\w$]*)", re.IGNORECASE)
+SCRIPT_INDEX_PATTERN = re.compile(r"SELECT\s+(\d+)\s+AS\s+SCRIPT_INDEX,\s*\((.*?)\)\s+AS\s+COUNT_VALUE", re.IGNORECASE)
+TABLE_NAME_PATTERN = re.compile(r"'([A-Z_][\w$]*)\.([A-Z_][\w$]*)'")
+
+# Columns of the synthetic tables compared by data checks
+DATA_COLUMNS = ("ID", "CUSTOMER_NAME", "AMOUNT", "LOAD_DATE")
+
+QueryRecord = namedtuple("QueryRecord", ["query_id", "sql_text"])
+
+class StandInError(Exception):
+    """Raised for statements the stand-in session does not know how to answer."""
+
+class SyntheticWarehouse:
+    """
+    Shared state behind every StandInSession of a benchmark run.
+
+    Holds the synthetic TEST_SCRIPTS catalog, the (row count, fingerprint) of
+    every source and target table, the RUN_ID counters and a log of executed
+    statements: (kind, thread, start, duration) tuples used for latency stats.
+    """
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.catalog = []
+        self.tables = {}
+        self.statements = []
+        self.uploaded_files = 0
+        self.uploaded_bytes = 0
+        self._run_numbers = defaultdict(int)
+        self._temp_tables = {}
+        self._lock = threading.Lock()
+
+    def record(self, kind, start, duration):
+        """Record one executed statement."""
+        with self._lock:
+            self.statements.append((kind, threading.get_ident(), start, duration))
+
+    def next_run_numbers(self, database_names):
+        """Increment and return the RUN_ID counter of every database, like the MERGE in allocate_run_metadata."""
+        with self._lock:
+            for name in database_names:
+                self._run_numbers[name] += 1
+            return {name: self._run_numbers[name] for name in database_names}
+
+    def store_temp_table(self, name, counts):
+        with self._lock:
+            self._temp_tables[name] = counts
+
+    def temp_table(self, name):
+        with self._lock:
+            return self._temp_tables.get(name, {})
+
+    def drop_temp_table(self, name):
+        with self._lock:
+            self._temp_tables.pop(name, None)
+
+def _fingerprint(seed):
+    """Deterministic 64-bit fingerprint standing in for HASH_AGG."""
+    return int.from_bytes(hashlib.blake2b(seed.encode(), digest_size=8).digest(), "big", signed=True)
+
+def build_synthetic_catalog(size, count_mismatch_rate=0.05, data_mismatch_rate=0.05, databases=3, seed=7,
+                            latency=0.0):
+    """
+    Build a warehouse holding `size` count and data checks over synthetic tables.
+
+    Every table gets one count check and one data check (the last table only a
+    count check when `size` is odd). Half of the count scripts are unfiltered,
+    so they take the table metadata path, and half carry a WHERE clause, so they
+    are batched. Every fourth data check is bucketed and every third is keyed,
+    so all data check modes are exercised.
+
+    Args:
+        size: Number of test cases
+        count_mismatch_rate: Share of tables whose target row count differs
+        data_mismatch_rate: Share of tables whose target rows differ at equal row count
+        databases: Number of databases the tables are spread over
+        seed: Random seed, so a catalog is identical across runs and commits
+        latency: Seconds added to every simulated round trip
+
+    Returns:
+        SyntheticWarehouse
+    """
+    rng = random.Random(seed)
+    warehouse = SyntheticWarehouse(latency)
+    column_list = ", ".join(DATA_COLUMNS)
+
+    for index in range(math.ceil(size / 2)):
+        database = f"BENCH_DB{index % databases}"
+        schema = "SALES"
+        table = f"T{index:05d}"
+        source_table = f"{database}.{schema}.{table}"
+        target_table = f"{database}_CLONED.{schema}.{table}"
+
+        row_count = rng.randint(1_000, 5_000_000)
+        target_row_count = row_count
+        target_fingerprint = _fingerprint(source_table)
+        if rng.random() < count_mismatch_rate:
+            target_row_count = row_count - rng.randint(1, 500)
+            target_fingerprint = _fingerprint(target_table)
+        elif rng.random() < data_mismatch_rate:
+            target_fingerprint = _fingerprint(target_table)
+        warehouse.tables[source_table] = (row_count, _fingerprint(source_table))
+        warehouse.tables[target_table] = (target_row_count, target_fingerprint)
+
+        count_filter = " WHERE LOAD_DATE IS NOT NULL" if index % 2 else ""
+        warehouse.catalog.append({
+            "TS_ID": f"OQ-FR-{database}-{schema}-04-{table}-Count",
+            "APPLICATION_NAME": database,
+            "SCHEMA_NAME": schema,
+            "VALIDATION_TYPE": "Count Check",
+            "SOURCE_SCRIPT": f"SELECT COUNT(*) AS {table}_Count FROM {source_table}{count_filter};",
+            "TARGET_SCRIPT": f"SELECT COUNT(*) AS Cloned_{table}_Count FROM {target_table}{count_filter};",
+            "MINUS_QUERY": "N/A",
+            "BUCKET_COUNT": None,
+            "BUCKET_KEY": None,
+            "COMPARE_KEY": None,
+        })
+        if len(warehouse.catalog) == size:
+            break
+        warehouse.catalog.append({
+            "TS_ID": f"OQ-FR-{database}-{schema}-05-{table}-Data",
+            "APPLICATION_NAME": database,
+            "SCHEMA_NAME": schema,
+            "VALIDATION_TYPE": "Data Check",
+            "SOURCE_SCRIPT": "N/A",
+            "TARGET_SCRIPT": "N/A",
+            "MINUS_QUERY": f"SELECT {column_list} FROM {source_table} MINUS SELECT {column_list} FROM {target_table};",
+            "BUCKET_COUNT": 16 if index % 4 == 0 else None,
+            "BUCKET_KEY": "ID" if index % 4 == 0 else None,
+            "COMPARE_KEY": "ID" if index % 3 == 0 else None,
+        })
+    return warehouse
+
+class StandInDataFrame:
+    """Lazily executed statement, mirroring the part of the Snowpark DataFrame API the services use."""
+
+    def __init__(self, session, query):
+        self._session = session
+        self._query = query
+
+    def collect(self):
+        return self._session._execute(self._query)
+
+    def to_pandas_batches(self):
+        yield from self._session._execute_batches(self._query)
+
+class StandInFileOperation:
+    """Counts files and bytes put on stages instead of uploading them."""
+
+    def __init__(self, warehouse):
+        self._warehouse = warehouse
+
+    def put(self, local_file_name, stage_location, auto_compress=True, overwrite=False, parallel=4):
+        start = time.perf_counter()
+        files = glob.glob(local_file_name)
+        size = sum(os.path.getsize(path) for path in files)
+        time.sleep(self._warehouse.latency)
+        with self._warehouse._lock:
+            self._warehouse.uploaded_files += len(files)
+            self._warehouse.uploaded_bytes += size
+        self._warehouse.record("stage_put", start, time.perf_counter() - start)
+        return []
+
+    def put_stream(self, input_stream, stage_location, auto_compress=True, overwrite=False):
+        start = time.perf_counter()
+        size = len(input_stream.read())
+        time.sleep(self._warehouse.latency)
+        with self._warehouse._lock:
+            self._warehouse.uploaded_files += 1
+            self._warehouse.uploaded_bytes += size
+        self._warehouse.record("stage_put", start, time.perf_counter() - start)
+        return None
+
+class StandInQueryHistory:
+    """Records the queries of a session while active, like Session.query_history()."""
+
+    def __init__(self, session):
+        self._session = session
+        self.queries = []
+        session._query_listeners.append(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._session._query_listeners.remove(self)
+
+class StandInSession:
+    """Answers the SQL issued by the pipeline from a SyntheticWarehouse."""
+
+    def __init__(self, warehouse, batch_rows=2_000):
+        self._warehouse = warehouse
+        self._batch_rows = batch_rows
+        self._query_listeners = []
+        self.file = StandInFileOperation(warehouse)
+
+    def sql(self, query):
+        return StandInDataFrame(self, query)
+
+    def query_history(self):
+        return StandInQueryHistory(self)
+
+    def close(self):
+        pass
+
+    def _execute(self, query):
+        """Execute one statement: classify it, wait the simulated latency and build its result rows."""
+        start = time.perf_counter()
+        kind, rows = self._answer(query)
+        time.sleep(self._warehouse.latency)
+        self._warehouse.record(kind, start, time.perf_counter() - start)
+        record = QueryRecord(str(uuid.uuid4()), query)
+        for listener in self._query_listeners:
+            listener.queries.append(record)
+        return rows
+
+    def _execute_batches(self, query):
+        """Stream the TEST_SCRIPTS catalog as pandas batches, like DataFrame.to_pandas_batches."""
+        if TEST_SCRIPTS_TABLE not in query or "ACTIVE_FLAG" not in query:
+            raise StandInError(f"Unsupported batched statement: {query.strip()[:120]}")
+        catalog = self._warehouse.catalog
+        for offset in range(0, len(catalog), self._batch_rows):
+            start = time.perf_counter()
+            batch = pd.DataFrame(catalog[offset:offset + self._batch_rows])
+            time.sleep(self._warehouse.latency)
+            self._warehouse.record("fetch_catalog", start, time.perf_counter() - start)
+            yield batch
+
+    def _table(self, name):
+        """(row count, fingerprint) of a table; unknown tables fail like a missing object would."""
+        try:
+            return self._warehouse.tables[name.upper()]
+        except KeyError:
+            raise StandInError(f"Object '{name}' does not exist or not authorized.") from None
+
+    def _source_and_target(self, query):
+        """Return the first two table references of a comparison statement."""
+        tables = QUALIFIED_TABLE_PATTERN.findall(query)
+        if len(tables) < 2:
+            raise StandInError(f"Expected a source and a target table: {query.strip()[:120]}")
+        return self._table(tables[0]), self._table(tables[1])
+
+    def _diff_counts(self, query):
+        """Rows only in source / only in target of the comparison in `query`."""
+        (source_rows, source_fp), (target_rows, target_fp) = self._source_and_target(query)
+        if source_fp == target_fp and source_rows == target_rows:
+            return 0, 0
+        changed = 1 + abs(source_fp - target_fp) % 50
+        return changed + max(0, source_rows - target_rows), changed + max(0, target_rows - source_rows)
+
+    def _answer(self, query):
+        """Route a statement to the matching synthetic result. Returns (statement kind, rows)."""
+        text = query.strip()
+        upper = text.upper()
+
+        if upper.startswith("EXECUTE IMMEDIATE") and RUN_ID_TRACKER_TABLE in text:
+            names = re.findall(r"\('([^']+)'\)", text.split("AS S", 1)[0])
+            numbers = self._warehouse.next_run_numbers(names)
+            return "allocate_run_ids", [
+                Row(USER_ID="BENCHMARK", EXECUTION_DATE="2026-01-01 00:00:00.000",
+                    DATABASE_NAME=name, RUN_NUMBER=number)
+                for name, number in numbers.items()
+            ]
+        if upper.startswith("INSERT INTO") and TEST_LOGS_TABLE in text:
+            return "log_insert", []
+        if upper.startswith("UPDATE") and TEST_SCRIPTS_TABLE in text:
+            return "deactivate", []
+        if upper.startswith("UPDATE") and TEST_LOGS_TABLE in text:
+            return "log_update", []
+        if "INFORMATION_SCHEMA.TABLES" in upper:
+            database = re.search(r"FROM\s+([\w$]+)\.INFORMATION_SCHEMA", text, re.IGNORECASE).group(1).upper()
+            rows = []
+            for schema, table in TABLE_NAME_PATTERN.findall(text.split(" IN ", 1)[-1]):
+                name = f"{database}.{schema}.{table}"
+                if name in self._warehouse.tables:
+                    rows.append(Row(TABLE_SCHEMA=schema, TABLE_NAME=table,
+                                    LAST_ALTERED="2026-01-01 00:00:00.000",
+                                    ROW_COUNT=self._warehouse.tables[name][0]))
+            return "table_metadata", rows
+        if "SCRIPT_INDEX" in upper:
+            rows = []
+            for index, script in SCRIPT_INDEX_PATTERN.findall(text):
+                table = QUALIFIED_TABLE_PATTERN.search(script).group(1)
+                rows.append(Row(SCRIPT_INDEX=int(index), COUNT_VALUE=self._table(table)[0]))
+            return "count_batch", rows
+        if TEST_LOGS_TABLE in text and "QUALIFY" in upper and "SOURCE_COUNT" in upper:
+            return "refresh_baselines", []
+        if TEST_LOGS_TABLE in text and "AVG(EXECUTION_TIME)" in upper:
+            return "execution_history", []
+        if TEST_LOGS_TABLE in text and upper.startswith("SELECT"):
+            return "log_read", []
+        if "SOURCE_FINGERPRINT" in upper:
+            (source_rows, source_fp), (target_rows, target_fp) = self._source_and_target(text)
+            return "fingerprint", [Row(SOURCE_ROWS=source_rows, SOURCE_FINGERPRINT=source_fp,
+                                       TARGET_ROWS=target_rows, TARGET_FINGERPRINT=target_fp)]
+        if "S.BUCKET = T.BUCKET" in upper:
+            source_only, target_only = self._diff_counts(text)
+            buckets = sorted({(source_only * 7 + i) % 16 for i in range(min(3, source_only + target_only))})
+            return "bucket_diff", [Row(BUCKET=bucket) for bucket in buckets]
+        if upper.startswith("CREATE TEMPORARY TABLE"):
+            name = text.split()[3]
+            source_only, target_only = self._diff_counts(text)
+            counts = {}
+            if source_only:
+                counts["Source_Only"] = source_only
+            if target_only:
+                counts["Target_Only"] = target_only
+            self._warehouse.store_temp_table(name, counts)
+            return "diff_materialize", []
+        if "DIFFERENCE_TYPE" in upper and "GROUP BY" in upper:
+            name = re.search(r"FROM\s+(MISMATCH_DIFF_\w+)", text).group(1)
+            counts = self._warehouse.temp_table(name)
+            return "diff_counts", [Row(DIFFERENCE_TYPE=kind, ROW_COUNT=count) for kind, count in counts.items()]
+        if upper.startswith("COPY FILES"):
+            return "stage_copy", []
+        if upper.startswith("REMOVE"):
+            return "stage_remove", []
+        if upper.startswith("COPY INTO"):
+            return "diff_unload", []
+        if upper.startswith("DROP TABLE"):
+            self._warehouse.drop_temp_table(text.split()[-1])
+            return "diff_drop", []
+        if "SOURCE_ONLY" in upper and "FULL OUTER JOIN" in upper:
+            source_only, target_only = self._diff_counts(text)
+            values = {"SOURCE_ONLY": max(0, source_only - target_only),
+                      "TARGET_ONLY": max(0, target_only - source_only)}
+            for index in sorted({int(i) for i in re.findall(r"\bC(\d+)_DIFF\b", text)}):
+                differs = min(source_only, target_only) if index % 2 == 0 else 0
+                values[f"C{index}_DIFF"] = differs
+                values[f"C{index}_MIN_KEY"] = "1" if differs else None
+                values[f"C{index}_MAX_KEY"] = str(differs) if differs else None
+            return "column_diff", [Row(**values)]
+        if TEST_SCRIPTS_TABLE in text and "LIKE" in upper:
+            table = re.search(r"LIKE\s+'%-%-%-%-%-([^-']+)-Count'", text).group(1)
+            rows = [Row(**row) for row in self._warehouse.catalog
+                    if row["VALIDATION_TYPE"] == "Count Check" and row["TS_ID"].split("-")[5] == table]
+            return "count_script_lookup", rows
+        if re.match(r"SELECT\s+COUNT\s*\(", upper):
+            table = QUALIFIED_TABLE_PATTERN.search(text).group(1)
+            return "count_query", [Row(COUNT_VALUE=self._table(table)[0])]
+        raise StandInError(f"Unsupported statement: {text[:120]}")
@@ -0,0 +1,133 @@
+"""
+Script Name: cli.py
+
+Description:
+One entry point for the utility's commands: running the tests (main.py) and the maintenance scripts under
+InteractSF/. Several commands can be chained with '+'; they run in order on one Snowflake session, so a chain
+pays process start-up, imports and authentication once. Each command imports its modules only when it runs,
+and every command line of the chain is validated before connecting.
+
+Usage:
+Run this script from the CLI using Python:
+> python cli.py run --workers 8
+> python cli.py reset
+> python cli.py activate + load --csv InteractSF/scripts.csv + run --report-mode failures
+> python cli.py regenerate --run-id CGDF_12 --upload
+
+Commands:
+- activate    : Set ACTIVE_FLAG = 'Y' for every test case (InteractSF/Activate_all_test_cases.py)
+- clear       : Truncate TEST_SCRIPTS (InteractSF/clear_scripts.py)
+- load        : Upsert a scripts CSV into TEST_SCRIPTS by TS_ID (InteractSF/load_scripts_sf_append.py)
+- reset       : Truncate TEST_LOGS, activate all tests, reset run numbers, empty the stages
+                (InteractSF/reset_utility_execution.py)
+- regenerate  : Rebuild PDF reports from TEST_LOGS (InteractSF/regenerate_reports.py)
+- run         : Execute the active test cases; takes every main.py option (python cli.py run --help)
+
+A chain stops at the first command that fails.
+
+Configuration:
+- Snowflake connection settings are loaded from 'config/connection.json'.
+"""
+
+import argparse
+import sys
+import time
+
+# Separates the commands of a chain
+CHAIN_SEPARATOR = "+"
+
+def build_parser():
+    """Build the parser of one command of a chain."""
+    parser = argparse.ArgumentParser(
+        prog="cli.py",
+        description="ETL testing utility for Snowflake pipelines.",
+        epilog=f"Chain commands with '{CHAIN_SEPARATOR}', e.g. "
+               f"python cli.py activate {CHAIN_SEPARATOR} load {CHAIN_SEPARATOR} run --workers 8",
+    )
+    commands = parser.add_subparsers(dest="command", required=True, metavar="COMMAND")
+    commands.add_parser("activate", help="Set ACTIVE_FLAG = 'Y' for every test case")
+    commands.add_parser("clear", help="Truncate TEST_SCRIPTS")
+    load = commands.add_parser("load", help="Upsert a scripts CSV into TEST_SCRIPTS by TS_ID")
+    load.add_argument("--csv", help="CSV file to load (default: InteractSF/scripts.csv)")
+    commands.add_parser("reset", help="Truncate TEST_LOGS, activate all tests, reset run numbers, empty the stages")
+    regenerate = commands.add_parser("regenerate", help="Rebuild PDF reports from TEST_LOGS")
+    regenerate.add_argument("--run-id", help="RUN_ID whose reports are rebuilt")
+    regenerate.add_argument("--ts-id", help="TS_ID whose report is rebuilt")
+    regenerate.add_argument("--output", help="Local folder for the PDFs (default: REPORT_OUTPUT_DIR from config.py)")
+    regenerate.add_argument("--upload", action="store_true", help="Also upload the reports to the results stage")
+    # main.py parses its own options (see parse_command); --help is passed through to it
+    commands.add_parser("run", help="Execute the active test cases (options as in main.py)", add_help=False)
+    return parser
+
+def split_chain(argv):
+    """Split the command line into the argument lists of the chained commands."""
+    segments = [[]]
+    for token in argv:
+        if token == CHAIN_SEPARATOR:
+            segments.append([])
+        else:
+            segments[-1].append(token)
+    return segments
+
+def parse_command(parser, segment):
+    """Parse and validate one command of the chain; exits with a usage error like argparse does."""
+    if not segment:
+        parser.error(f"expected a command (chain commands with '{CHAIN_SEPARATOR}')")
+    if segment[0] == "run":
+        # Importing main.py is only paid when the chain runs tests
+        import main as pipeline
+        return argparse.Namespace(command="run", argv=segment[1:], options=pipeline.parse_args(segment[1:], prog="cli.py run"))
+    args = parser.parse_args(segment)
+    if args.command == "regenerate" and not args.run_id and not args.ts_id:
+        parser.error("regenerate: one of --run-id or --ts-id is required")
+    return args
+
+def run_command(session, args):
+    """Run one parsed command on `session`. Returns True on success."""
+    if args.command == "activate":
+        from InteractSF.Activate_all_test_cases import activate_all_test_cases
+        return activate_all_test_cases(session)
+    if args.command == "clear":
+        from InteractSF.clear_scripts import clear_scripts
+        return clear_scripts(session)
+    if args.command == "load":
+        from InteractSF.load_scripts_sf_append import load_scripts_to_snowflake
+        return load_scripts_to_snowflake(session, args.csv)
+    if args.command == "reset":
+        from InteractSF.reset_utility_execution import reset_utility_execution
+        return reset_utility_execution(session)
+    if args.command == "regenerate":
+        from InteractSF.regenerate_reports import regenerate
+        from config.config import REPORT_OUTPUT_DIR
+        return regenerate(session, args.run_id, args.ts_id, args.output or REPORT_OUTPUT_DIR, args.upload)
+    if args.command == "run":
+        import main as pipeline
+        pipeline.main(args.argv, session)
+        return True
+    raise ValueError(f"Unknown command: {args.command}")
+
+def main(argv=None):
+    parser = build_parser()
+    chain = [parse_command(parser, segment) for segment in split_chain(sys.argv[1:] if argv is None else argv)]
+
+    from utils.db_utils import create_session
+    print("Connecting Snowflake...")
+    session = create_session()
+    print("✅Connected to Snowflake❄️  |^-^|")
+    try:
+        for args in chain:
+            if len(chain) > 1:
+                print(f"\n▶ {args.command}")
+            start = time.perf_counter()
+            if not run_command(session, args):
+                print(f"⏹ Stopping: '{args.command}' failed.")
+                return 1
+            if len(chain) > 1:
+                print(f"  ({args.command} took {time.perf_counter() - start:.1f}s)")
+        return 0
+    finally:
+        session.close()
+        print("🔒 Snowflake session closed.")
+
+if __name__ == "__main__":
+    sys.exit(main())
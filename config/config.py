@@ -4,11 +4,15 @@
 TEST_SCRIPTS_TABLE = "TEST_AUTOMATION_UTILITY.PUBLIC.TEST_SCRIPTS"
 TEST_LOGS_TABLE = "TEST_AUTOMATION_UTILITY.PUBLIC.TEST_LOGS"
 RUN_ID_TRACKER_TABLE = "TEST_AUTOMATION_UTILITY.PUBLIC.RUN_ID_TRACKER"
+TEST_QUEUE_TABLE = "TEST_AUTOMATION_UTILITY.PUBLIC.TEST_QUEUE"
 
 # Snowflake stages
 MISMATCH_RESULTS_STAGE = "@TEST_AUTOMATION_UTILITY.PUBLIC.MISMATCH_RESULTS"
 TEST_CASE_RESULTS_STAGE = "@TEST_AUTOMATION_UTILITY.PUBLIC.TEST_CASE_RESULTS"
 
+# Temporary stage of catalog loads (InteractSF/load_scripts_sf_append.py); created per session, so no '@' here
+CATALOG_LOAD_STAGE = "TEST_AUTOMATION_UTILITY.PUBLIC.CATALOG_LOAD_STAGE"
+
 # Test case settings
 TEST_ACTIVE_FLAG = "Y"
 
@@ -34,4 +38,82 @@ count_expected_result = "Count Match"           #Expected result
 
 count_data_refreshed = "[Count Matched] - Data Refreshed"
 count_data_not_refreshed = "[Count Matched] - Data Not Refreshed"                     #Data Not Refreshed
-count_data_refreshed_expected_result = "Data Refreshed"                               #Data Refreshed Expected result
\ No newline at end of file
+count_data_refreshed_expected_result = "Data Refreshed"                               #Data Refreshed Expected result
+
+#==========================================================================================================================#
+#Change detection Strings for Result 
+skipped_status = "Skipped"                                                             #Status of tests skipped as unchanged
+unchanged_expected_result = "Tables Changed Since Last Pass"                           #Expected result
+unchanged_actual_result = "Tables Unchanged Since Last Pass, Validation Skipped"      #Actual result
+#==========================================================================================================================#
+#Parallel execution settings
+MAX_WORKERS = 4                                   #Number of worker threads (and pooled Snowflake sessions) used to run tests
+COUNT_BATCH_SIZE = 50                             #Max count scripts fused into one multi-count statement
+COUNT_METADATA_FAST_PATH = True                   #Answer unfiltered single-table COUNT(*) scripts from INFORMATION_SCHEMA.TABLES
+
+#==========================================================================================================================#
+#Scheduling
+SCHEDULE_LONGEST_FIRST = True                     #Order tests by historical EXECUTION_TIME, longest first, grouped by table
+SCHEDULER_HISTORY_RUNS = 5                        #Most recent runs of a TS_ID averaged into its estimate
+SCHEDULER_DEFAULT_ESTIMATE_SECONDS = 5.0          #Estimate of a new test when no test of its validation type has history
+
+#==========================================================================================================================#
+#Distributed runs (main.py --distributed / --join)
+QUEUE_CLAIM_BATCH_SIZE = 20                       #Test cases a runner claims from TEST_QUEUE at a time
+QUEUE_LEASE_SECONDS = 300                         #A claim not renewed for this long is reclaimed by another runner
+QUEUE_POLL_SECONDS = 15                           #Wait between claim attempts while other runners still hold leases
+QUEUE_MAX_ATTEMPTS = 3                            #Claims per test case before it is left as abandoned (e.g. it crashes runners)
+QUEUE_PUBLISH_BATCH_SIZE = 1000                   #TEST_QUEUE rows per INSERT when a run is published
+
+#==========================================================================================================================#
+#TEST_LOGS buffering
+LOG_FLUSH_ROWS = 200                              #Flush buffered TEST_LOGS rows once this many are pending
+LOG_FLUSH_SECONDS = 30                            #...or once the oldest pending row is this many seconds old
+
+#==========================================================================================================================#
+#Checkpointing (main.py --resume)
+CHECKPOINT_JOURNAL = True                         #Journal every logged result locally so an interrupted run can be resumed
+CHECKPOINT_DIR = "checkpoints"                    #Folder of the per-RUN_ID journals (<RUN_ID>.jsonl)
+
+#==========================================================================================================================#
+#Data refresh baselines
+REFRESH_BASELINE_LOOKBACK_DAYS = None             #Only read TEST_LOGS rows this recent when loading baselines (None = all history)
+
+#==========================================================================================================================#
+#Query result cache
+QUERY_CACHE_SIZE = 10000                          #Max distinct query results kept per run by utils/db_utils.execute_query
+
+#==========================================================================================================================#
+#Data check settings
+DATA_CHECK_FINGERPRINT = True                     #Compare COUNT(*) + HASH_AGG(*) of both sides first; run MINUS only if they differ
+MISMATCH_EXPORT_MAX_ROWS = 1000000                #Max mismatched rows unloaded to MISMATCH_RESULTS_STAGE per test (None = no cap)
+
+#==========================================================================================================================#
+#PDF report rendering
+PDF_RENDER_WORKERS = 2                            #Background processes rendering PDF reports off the test execution path
+
+#==========================================================================================================================#
+#Stage uploads
+UPLOAD_BATCH_SIZE = 100                           #Artifacts per batched upload (one PUT + one COPY FILES)
+UPLOAD_FLUSH_SECONDS = 10                         #Upload a partial batch once it has waited this long
+UPLOAD_PARALLEL = 4                               #Threads used by each PUT
+UPLOAD_STAGING_PREFIX = "_uploads"                #Stage prefix a batch is PUT to before COPY FILES moves it into place
+
+#==========================================================================================================================#
+#Catalog loading
+CATALOG_LOAD_CHUNK_ROWS = 50000                   #Test cases per compressed chunk file PUT to CATALOG_LOAD_STAGE and COPYed
+
+#==========================================================================================================================#
+#PDF report mode
+REPORT_MODES = ("none", "failures", "all")
+REPORT_MODE = "all"                               #none: no PDFs | failures: only Fail/Error results | all: every result
+REPORT_OUTPUT_DIR = "reports"                     #Local folder for reports regenerated from TEST_LOGS
+
+#==========================================================================================================================#
+#Change detection
+SKIP_UNCHANGED = False                            #Skip tests whose tables were not altered since their last passing run
+
+#==========================================================================================================================#
+#Profiling (main.py --profile)
+PROFILE_OUTPUT_DIR = "profiles"                   #Default folder for trace-event JSON files and sampled stack profiles
+PROFILE_SAMPLE_INTERVAL_MS = 10                   #Interval of the sampling stack profiler (--profile-cpu)
@@ -1,71 +1,348 @@
 """Main entry point for ETL testing utility."""
-from utils.db_utils import create_session
-from services.test_fetcher import fetch_active_test_cases, get_run_metadata
-from services.test_executor import execute_test_case
+import argparse
+import os
+import time
+from datetime import datetime
+
+from utils.db_utils import create_session, SessionPool, get_object_details, enable_query_cache
+from services.test_fetcher import fetch_active_test_cases, allocate_run_metadata
+from services.parallel_executor import execute_test_cases_parallel
+from services.count_batcher import prefetch_count_results
+from services.test_logger import enable_log_buffer, flush_log_buffer, set_report_mode, set_checkpoint_journal
+from services.data_refresh_check import load_refresh_baselines
+from services.report_renderer import start_report_renderer, join_report_renderer, write_report_updates
+from services.stage_uploader import StageUploader
+from services.change_detection import find_unchanged_test_cases, build_skipped_result
+from services.scheduler import load_execution_history, estimate_durations, build_schedule, predict_makespan
+from services.test_logger import log_test_result
+from services.work_queue import new_queue_id, publish_test_cases, load_queue_manifest
+from services.queue_worker import run_queue_worker
+from services.checkpoint import CheckpointJournal, resume_run
+from utils.profiling import enable_tracing, trace_span, StackSampler
+from config.config import MAX_WORKERS, COUNT_BATCH_SIZE, PDF_RENDER_WORKERS, REPORT_MODE, REPORT_MODES, \
+    SKIP_UNCHANGED, COUNT_METADATA_FAST_PATH, PROFILE_OUTPUT_DIR, SCHEDULE_LONGEST_FIRST, QUEUE_CLAIM_BATCH_SIZE, \
+    CHECKPOINT_JOURNAL, CHECKPOINT_DIR, skipped_status
 from tqdm import tqdm
 
-def main():
-    """Main handler function for ETL testing."""
+def parse_args(argv=None, prog=None):
+    """Parse command line arguments (sys.argv unless `argv` is given)."""
+    parser = argparse.ArgumentParser(prog=prog, description="ETL testing utility for Snowflake pipelines.")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS,
+                        help=f"Number of tests executed concurrently, one Snowflake session each (default: {MAX_WORKERS})")
+    parser.add_argument("--report-mode", choices=REPORT_MODES, default=REPORT_MODE,
+                        help=f"Which results get a PDF report: none, failures (Fail/Error) or all (default: {REPORT_MODE})")
+    parser.add_argument("--skip-unchanged", action=argparse.BooleanOptionalAction, default=SKIP_UNCHANGED,
+                        help="Skip tests whose tables were not altered since their last passing run")
+    parser.add_argument("--longest-first", action=argparse.BooleanOptionalAction, default=SCHEDULE_LONGEST_FIRST,
+                        help="Run tests longest first by historical EXECUTION_TIME, grouped by table "
+                             "(--no-longest-first keeps the TEST_SCRIPTS order)")
+    parser.add_argument("--profile", nargs="?", const="", metavar="TRACE_FILE",
+                        help=f"Write a Chrome/Perfetto trace-event timeline of every stage, test, phase and worker "
+                             f"(default file: {PROFILE_OUTPUT_DIR}/trace_<timestamp>.json)")
+    parser.add_argument("--profile-cpu", action="store_true",
+                        help="With --profile, also sample Python stacks into a folded profile next to the trace")
+    distributed = parser.add_mutually_exclusive_group()
+    distributed.add_argument("--distributed", action="store_true",
+                             help="Publish this run's test cases into TEST_QUEUE and work on them; more runners "
+                                  "can join with --join <QUEUE_ID>")
+    distributed.add_argument("--join", metavar="QUEUE_ID",
+                             help="Work on a distributed run published by another runner")
+    distributed.add_argument("--resume", nargs="+", metavar="RUN_ID",
+                             help="Finish interrupted runs: execute only the tests these RUN_IDs (one per database) "
+                                  "did not complete, logging into the same RUN_IDs")
+    parser.add_argument("--checkpoint", action=argparse.BooleanOptionalAction, default=CHECKPOINT_JOURNAL,
+                        help=f"Journal completed tests in {CHECKPOINT_DIR}/ so an interrupted run can be resumed "
+                             f"with --resume")
+    parser.add_argument("--claim-batch-size", type=int, default=QUEUE_CLAIM_BATCH_SIZE,
+                        help=f"Test cases a distributed runner claims at a time (default: {QUEUE_CLAIM_BATCH_SIZE})")
+    return parser.parse_args(argv)
+
+def table_names_of(ts_ids):
+    """Table names of well-formed TS_IDs."""
+    return {get_object_details(ts_id)[2] for ts_id in ts_ids if len(ts_id.split('-')) == 7}
+
+def main(argv=None, session=None):
+    """
+    Main handler function for ETL testing.
+
+    Args:
+        argv: Command line arguments (default: sys.argv)
+        session: Optional open Snowflake session to run on (e.g. shared by chained cli.py commands);
+                 it is left open. Without one a session is created and closed here.
+    """
+    args = parse_args(argv)
+
+    # Profiling: a trace timeline, optionally with a sampled stack profile of this process
+    trace_recorder = None
+    stack_sampler = None
+    if args.profile is not None or args.profile_cpu:
+        trace_recorder = enable_tracing()
+        trace_path = args.profile or os.path.join(
+            PROFILE_OUTPUT_DIR, f"trace_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.json"
+        )
+        if args.profile_cpu:
+            stack_sampler = StackSampler()
+            stack_sampler.start()
+
     # Create a session
-    print("Connecting Snowflake...")
-    session = create_session()
-    print("✅Connected to Snowflake❄️  |^-^|")
+    own_session = session is None
+    if own_session:
+        print("Connecting Snowflake...")
+        session = create_session()
+        print("✅Connected to Snowflake❄️  |^-^|")
+    session_pool = SessionPool(args.workers, seed_session=session)
+    # Distributed runners hold their log rows and write them together with the completion of each claim
+    queue_id = args.join or (new_queue_id() if args.distributed else None)
+    enable_log_buffer(auto_flush=queue_id is None)
+    set_report_mode(args.report_mode)
+    query_cache = enable_query_cache()
+    report_session = None
+    uploader = None
+    checkpoint_journal = None
+    finished = False
 
     try:
-        # Fetch test cases
-        print("Fetching active test cases...")
-        test_cases = fetch_active_test_cases(session)
-        
-        if not test_cases:
-            print("No active test cases found.")
-            return
-        
-        print(f"Found {len(test_cases)} active test cases.")
-        
-        # Group test cases by database name
-        test_cases_by_db = {}
-        for test_case in test_cases:
-            if test_case.application_name not in test_cases_by_db:
-                test_cases_by_db[test_case.application_name] = []
-            test_cases_by_db[test_case.application_name].append(test_case)
-        
-        # Generate run IDs for each database separately
-        print("Generating run metadata...")
-        run_metadata_map = {}
-        for db_name in test_cases_by_db.keys():
-            run_metadata_map[db_name] = get_run_metadata(session, db_name)
-            print(f"  - Generated run ID for {db_name}")
-        
-        # Execute tests with progress bar
-        print("Executing test cases:")
         results = []
-        total_test_count = sum(len(cases) for cases in test_cases_by_db.values())
-        
-        with tqdm(total=total_test_count, desc="Progress", unit="test") as progress_bar:
-            for db_name, db_test_cases in test_cases_by_db.items():
-                run_metadata = run_metadata_map[db_name]
-                
-                for test_case in db_test_cases:
-                    status = execute_test_case(session, test_case, run_metadata)
-                    results.append(status)
-                    progress_bar.update(1)
-                    # Optional: Add description of current test
-                    progress_bar.set_postfix_str(f"DB: {db_name} - Last: {status}")
+        dropped = 0
+        queue_summary = None
+        predicted_makespan = None
+        if args.join:
+            # Joining a published run: its RUN_IDs and test cases come from TEST_QUEUE
+            print(f"Joining distributed run {queue_id}...")
+            run_ids, queued_ts_ids = load_queue_manifest(session, queue_id)
+            if not queued_ts_ids:
+                print(f"No test cases were published under queue ID {queue_id}.")
+                return
+            print(f"Found {len(queued_ts_ids)} queued test cases.")
+
+            # Results other runners already logged under these RUN_IDs are not baselines
+            print("Loading data refresh baselines...")
+            with trace_span("load refresh baselines", "stage"):
+                refresh_baselines = load_refresh_baselines(
+                    session, table_names_of(queued_ts_ids), exclude_run_ids=run_ids.values()
+                )
+            print(f"  - Loaded baselines for {len(refresh_baselines)} tables")
+        else:
+            # Fetch test cases
+            print("Fetching active test cases...")
+            with trace_span("fetch test cases", "stage"):
+                test_cases = fetch_active_test_cases(session)
+            
+            if not test_cases:
+                print("No active test cases found.")
+                return
+            
+            print(f"Found {len(test_cases)} active test cases.")
+
+            # Resuming: reuse the RunMetadata of the interrupted runs and drop the tests they completed
+            if args.resume:
+                print("Loading checkpoints of the resumed runs...")
+                with trace_span("load checkpoints", "stage"):
+                    run_metadata_map, completed, recovered = resume_run(session, args.resume)
+                if recovered:
+                    print(f"  - Recovered {recovered} journaled results missing from TEST_LOGS")
+                test_cases = [tc for tc in test_cases
+                              if tc.application_name in run_metadata_map and tc.ts_id not in completed]
+                print(f"  - {len(completed)} test cases already completed, {len(test_cases)} left to run")
+                if not test_cases:
+                    print("Nothing left to run.")
+                    return
+            
+            # Group test cases by database name
+            test_cases_by_db = {}
+            for test_case in test_cases:
+                if test_case.application_name not in test_cases_by_db:
+                    test_cases_by_db[test_case.application_name] = []
+                test_cases_by_db[test_case.application_name].append(test_case)
+            
+            # Generate run IDs for each database separately
+            if not args.resume:
+                print("Generating run metadata...")
+                with trace_span("allocate run IDs", "stage"):
+                    run_metadata_map = allocate_run_metadata(session, test_cases_by_db.keys())
+                for db_name in test_cases_by_db.keys():
+                    print(f"  - Generated run ID for {db_name}")
+            run_ids = {db_name: metadata.run_id for db_name, metadata in run_metadata_map.items()}
+
+            # Journal completed tests so the run can be resumed (a distributed run resumes through its queue)
+            if args.checkpoint and queue_id is None:
+                checkpoint_journal = CheckpointJournal(run_metadata_map)
+                set_checkpoint_journal(checkpoint_journal)
+            
+            # Load the latest passing counts per table once, before this run logs anything
+            # (results a resumed run already logged are not baselines)
+            print("Loading data refresh baselines...")
+            with trace_span("load refresh baselines", "stage"):
+                refresh_baselines = load_refresh_baselines(
+                    session, table_names_of(tc.ts_id for tc in test_cases),
+                    exclude_run_ids=run_ids.values() if args.resume else None
+                )
+            print(f"  - Loaded baselines for {len(refresh_baselines)} tables")
+
+        # Render PDF reports in the background and upload them in batches on a dedicated session
+        if args.report_mode != "none":
+            report_session = create_session()
+            uploader = StageUploader(report_session)
+            start_report_renderer(uploader, PDF_RENDER_WORKERS)
+
+        if not args.join:
+            # Skip tests whose tables are untouched since they last passed
+            if args.skip_unchanged:
+                print("Detecting unchanged tables...")
+                with trace_span("detect unchanged tables", "stage"):
+                    unchanged = find_unchanged_test_cases(session, test_cases)
+                for db_name, db_test_cases in test_cases_by_db.items():
+                    for test_case in db_test_cases:
+                        if test_case.ts_id in unchanged:
+                            log_test_result(session, build_skipped_result(test_case, unchanged[test_case.ts_id]),
+                                            run_metadata_map[db_name])
+                            results.append(skipped_status)
+                    test_cases_by_db[db_name] = [tc for tc in db_test_cases if tc.ts_id not in unchanged]
+                test_cases = [tc for tc in test_cases if tc.ts_id not in unchanged]
+                print(f"  - Skipped {len(unchanged)} test cases with unchanged tables")
+
+            # Answer bare counts from table metadata and fuse simple ones into batched multi-count statements
+            # (distributed runners prefetch per claimed batch instead)
+            prefetched_counts = None
+            if queue_id is None:
+                print("Prefetching count check results...")
+                with trace_span("prefetch counts", "stage"):
+                    prefetched_counts = prefetch_count_results(
+                        session_pool, test_cases, COUNT_BATCH_SIZE, session_pool.size, COUNT_METADATA_FAST_PATH
+                    )
+                from_metadata = sum(1 for _, method in prefetched_counts.values() if method == "metadata")
+                print(f"  - Resolved {len(prefetched_counts)} count scripts ({from_metadata} from table metadata)")
+
+            # Order tests longest first from their TEST_LOGS history, keeping tests of one table together
+            schedule = None
+            if args.longest_first:
+                print("Scheduling tests longest first...")
+                with trace_span("schedule tests", "stage"):
+                    estimates = estimate_durations(test_cases, load_execution_history(session))
+                    schedule = build_schedule(test_cases_by_db, estimates)
+                # Only meaningful for a single runner; a distributed run's makespan depends on how many join
+                if queue_id is None:
+                    predicted_makespan = predict_makespan(schedule, estimates, session_pool.size)
+                    print(f"  - Predicted execution time: {predicted_makespan:.1f}s")
+
+            if queue_id is not None:
+                # Skipped results are written now: runners only write the results of their own claims
+                flush_log_buffer(session)
+                if schedule is None:
+                    schedule = [(db_name, test_case)
+                                for db_name, db_test_cases in test_cases_by_db.items() for test_case in db_test_cases]
+                print("Publishing test cases for distributed execution...")
+                with trace_span("publish test cases", "stage"):
+                    published = publish_test_cases(session, queue_id, schedule, run_metadata_map)
+                print(f"  - Published {published} test cases under queue ID {queue_id}")
+                print(f"  - Start more runners with: python main.py --join {queue_id}")
+
+        # Execute tests with progress bar
+        execution_start = time.perf_counter()
+        if queue_id is not None:
+            print(f"Executing claimed test cases with {session_pool.size} worker(s):")
+            with tqdm(desc="Progress (this runner)", unit="test") as progress_bar, \
+                    trace_span("execute tests", "stage"):
+                statuses, dropped, queue_summary = run_queue_worker(
+                    session, session_pool, queue_id, progress_bar, args.claim_batch_size
+                )
+                results += statuses
+        else:
+            print(f"Executing test cases with {session_pool.size} worker(s):")
+            total_test_count = sum(len(cases) for cases in test_cases_by_db.values())
+            with tqdm(total=total_test_count, desc="Progress", unit="test") as progress_bar, \
+                    trace_span("execute tests", "stage", tests=total_test_count):
+                results += execute_test_cases_parallel(
+                    session_pool, test_cases_by_db, run_metadata_map, session_pool.size, progress_bar,
+                    prefetched_counts, schedule
+                )
+        actual_makespan = time.perf_counter() - execution_start
         
+        # Wait for outstanding PDF reports
+        failed_reports = 0
+        if uploader is not None:
+            print("Waiting for PDF reports to finish rendering...")
+            with trace_span("finish reports", "stage"):
+                failed_reports = join_report_renderer()
+                failed_reports += uploader.close()
+            uploader = None
+
         # Report summary
         total = len(results)
         passed = results.count("Pass")
         failed = results.count("Fail")
         error = results.count("Error")
+        skipped = results.count(skipped_status)
         print(f"\nTest execution completed: {passed}/{total} tests passed✅ ({failed} failed❌)({error} error⚠️ ).")
+        if skipped:
+            print(f"{skipped} test(s) skipped because their tables were unchanged since the last pass.")
+        if queue_summary is not None:
+            print(f"Distributed run {queue_id}: {queue_summary['done']} test(s) done by all runners.")
+            if dropped:
+                print(f"⚠️ {dropped} result(s) of this runner were dropped after losing their lease; "
+                      f"other runners re-executed those tests.")
+            if queue_summary["abandoned"]:
+                print(f"⚠️ {queue_summary['abandoned']} test(s) were abandoned after failing to complete "
+                      f"on repeated claims.")
+        if predicted_makespan is not None:
+            print(f"Execution time: {actual_makespan:.1f}s (predicted {predicted_makespan:.1f}s).")
+        hits, misses = query_cache.stats()
+        print(f"Query cache: {hits} hits, {misses} misses.")
         print("Generated RUN_IDs:")
-        for db_name, metadata in run_metadata_map.items():
-            print(f"{db_name}: {metadata.run_id}")
-        print("Test reports have been saved as PDF files.")
+        for db_name, run_id in run_ids.items():
+            print(f"{db_name}: {run_id}")
+        if failed_reports:
+            print(f"⚠️ {failed_reports} test report(s) could not be saved.")
+        if args.report_mode == "all":
+            print("Test reports have been saved as PDF files.")
+        elif args.report_mode == "failures":
+            print("Test reports for failed and errored tests have been saved as PDF files.")
+        finished = True
     
     finally:
-        # Close session
-        session.close()
+        # Finish reports already queued, even if the run was interrupted
+        try:
+            join_report_renderer()
+        except Exception as e:
+            print(f"❌ Failed to finish test reports: {e}")
+        if uploader is not None:
+            uploader.close()
+
+        # Write any buffered TEST_LOGS rows, even if the run was interrupted
+        try:
+            with trace_span("flush test logs", "stage"):
+                flush_log_buffer(session)
+        except Exception as e:
+            print(f"❌ Failed to flush test logs: {e}")
+
+        # Write report render/upload times, and 'N/A' for reports that were never saved, to their rows
+        try:
+            write_report_updates(session)
+        except Exception as e:
+            print(f"❌ Failed to update test logs of background reports: {e}")
+
+        if checkpoint_journal is not None:
+            set_checkpoint_journal(None)
+            checkpoint_journal.close()
+            if not finished:
+                print(f"Run interrupted; finish it with: python main.py --resume {' '.join(run_ids.values())}")
+
+        # Write the profile, also for interrupted runs
+        if trace_recorder is not None:
+            trace_recorder.write(trace_path)
+            print(f"Profile timeline written to {trace_path} (open in https://ui.perfetto.dev)")
+            if stack_sampler is not None:
+                stack_sampler.stop()
+                folded_path = f"{os.path.splitext(trace_path)[0]}.folded"
+                stack_sampler.write_folded(folded_path)
+                print(f"Sampled stack profile written to {folded_path} (open in https://www.speedscope.app)")
+
+        # Close pooled worker sessions, then the main session
+        session_pool.close(keep=session)
+        if report_session is not None:
+            report_session.close()
+        if own_session:
+            session.close()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,9 +1,13 @@
 """Data classes for ETL testing."""
 
-from dataclasses import dataclass
+import sys
+from dataclasses import dataclass, field
 from typing import Optional, Any
 
-@dataclass
+# __slots__ keeps instances compact for catalogs with tens of thousands of test cases
+_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(**_SLOTS)
 class RunMetadata:
     """Data class for run metadata."""
     user_id: str
@@ -11,7 +15,7 @@ class RunMetadata:
     run_id: str
     database_name: str
 
-@dataclass
+@dataclass(**_SLOTS)
 class TestCase:
     """Data class for a test case."""
     ts_id: str
@@ -21,8 +25,11 @@ class TestCase:
     source_script: str
     target_script: str
     minus_query: str
+    bucket_count: int = 0      # > 1 enables bucketed data check comparison
+    bucket_key: str = ""       # Key column(s) rows are hashed into buckets by
+    compare_key: str = ""      # Key column(s) enabling column-level difference localization
 
-@dataclass
+@dataclass(**_SLOTS)
 class TestResult:
     """Data class for a test result."""
     ts_id: str
@@ -39,4 +46,10 @@ class TestResult:
     minus_query_file_path: str = "N/A"
     execution_time: float = 0.0
     error_description: str = "N/A"
-    result_file_path: str = "N/A"
\ No newline at end of file
+    result_file_path: str = "N/A"
+    source_only_count: Any = "NULL"     # Data Check: rows only in source (computed server-side)
+    target_only_count: Any = "NULL"     # Data Check: rows only in target (computed server-side)
+    count_method: str = "N/A"           # Count Check: how source|target counts were obtained (metadata, batched, query)
+    column_differences: Any = None      # Data Check keyed mode: list of (column, differing rows, example keys)
+    phase_timings: dict = field(default_factory=dict)  # Seconds per phase (see utils/timing.PHASES)
+    query_ids: list = field(default_factory=list)      # Snowflake query IDs issued while executing the test
\ No newline at end of file
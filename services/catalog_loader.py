@@ -0,0 +1,161 @@
+"""Bulk loading of test case catalogs (CSV) into TEST_SCRIPTS: chunked PUT, COPY INTO and MERGE by TS_ID."""
+import csv
+import gzip
+import os
+import re
+import shutil
+import tempfile
+import uuid
+
+from config.config import TEST_SCRIPTS_TABLE, CATALOG_LOAD_STAGE, CATALOG_LOAD_CHUNK_ROWS, UPLOAD_PARALLEL
+from utils.profiling import trace_span
+
+IDENTIFIER_PATTERN = re.compile(r"^[A-Za-z_][A-Za-z0-9_$]*$")
+
+def read_csv_columns(csv_path):
+    """
+    Read and validate the header of a catalog CSV.
+
+    Returns:
+        list: Upper-cased column names
+
+    Raises:
+        ValueError: When the header is empty, has no TS_ID, repeats a column or contains a non-identifier name
+    """
+    with open(csv_path, newline="", encoding="utf-8-sig") as f:
+        header = next(csv.reader(f), None)
+    if not header:
+        raise ValueError(f"{csv_path} has no header row")
+    columns = [name.strip().upper() for name in header]
+    invalid = [name for name in columns if not IDENTIFIER_PATTERN.match(name)]
+    if invalid:
+        raise ValueError(f"Invalid column name(s) in {csv_path}: {', '.join(invalid)}")
+    if len(set(columns)) != len(columns):
+        raise ValueError(f"Duplicate column names in {csv_path}")
+    if "TS_ID" not in columns:
+        raise ValueError(f"{csv_path} has no TS_ID column")
+    return columns
+
+def write_csv_chunks(csv_path, output_dir, chunk_rows=CATALOG_LOAD_CHUNK_ROWS):
+    """
+    Stream a catalog CSV into gzip-compressed chunk files of at most `chunk_rows` records.
+
+    Records are re-written with the csv module, so quoted fields spanning
+    several lines (multi-line SQL scripts) never get split across chunks.
+    Chunk names are zero-padded, so their sort order is the file order.
+
+    Returns:
+        tuple: (number of records, number of chunk files)
+    """
+    chunk_rows = max(1, chunk_rows)
+    records = 0
+    chunks = 0
+    writer = None
+    out = None
+    try:
+        with open(csv_path, newline="", encoding="utf-8-sig") as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            for record in reader:
+                if not any(field.strip() for field in record):
+                    continue
+                if records % chunk_rows == 0:
+                    if out is not None:
+                        out.close()
+                    chunks += 1
+                    out = gzip.open(os.path.join(output_dir, f"catalog_{chunks:06d}.csv.gz"), "wt",
+                                    newline="", encoding="utf-8", compresslevel=1)
+                    writer = csv.writer(out)
+                writer.writerow(record)
+                records += 1
+    finally:
+        if out is not None:
+            out.close()
+    return records, chunks
+
+def build_merge_query(staging_table, columns):
+    """
+    MERGE the staged rows into TEST_SCRIPTS by TS_ID.
+
+    When a TS_ID appears several times in the catalog the last occurrence
+    wins. Matched rows are only updated when a value actually differs, so
+    loading the same catalog again changes nothing.
+    """
+    values = [name for name in columns if name != "TS_ID"]
+    changed = " OR ".join(f"NOT EQUAL_NULL(T.{name}, S.{name})" for name in values)
+    update = ", ".join(f"{name} = S.{name}" for name in values)
+    matched = f"""
+        WHEN MATCHED AND ({changed}) THEN UPDATE SET {update}""" if values else ""
+    return f"""
+        MERGE INTO {TEST_SCRIPTS_TABLE} AS T
+        USING (
+            SELECT {", ".join(columns)}
+            FROM {staging_table}
+            QUALIFY ROW_NUMBER() OVER (PARTITION BY TS_ID ORDER BY LOAD_FILE DESC, LOAD_ROW DESC) = 1
+        ) AS S
+        ON T.TS_ID = S.TS_ID{matched}
+        WHEN NOT MATCHED THEN INSERT ({", ".join(columns)}) VALUES ({", ".join(f"S.{name}" for name in columns)})
+    """
+
+def load_catalog_csv(session, csv_path, chunk_rows=CATALOG_LOAD_CHUNK_ROWS):
+    """
+    Load a catalog CSV into TEST_SCRIPTS as an idempotent upsert by TS_ID.
+
+    The CSV is streamed into compressed chunk files, which are uploaded with
+    one wildcard PUT to a temporary stage and bulk loaded with COPY INTO a
+    temporary table shaped like TEST_SCRIPTS. One MERGE then inserts new
+    TS_IDs and updates changed ones. The CSV header names the columns (any
+    subset of TEST_SCRIPTS columns, TS_ID included).
+
+    Args:
+        session: Snowflake session
+        csv_path: Catalog CSV with a header row
+        chunk_rows: Records per uploaded chunk file
+
+    Returns:
+        dict: 'rows' read from the CSV, 'files' uploaded, 'distinct' TS_IDs, 'inserted' and 'updated' rows
+    """
+    columns = read_csv_columns(csv_path)
+    load_id = uuid.uuid4().hex[:12]
+    stage_path = f"@{CATALOG_LOAD_STAGE}/{load_id}"
+    staging_table = f"{TEST_SCRIPTS_TABLE}_LOAD_{load_id.upper()}"
+    local_dir = tempfile.mkdtemp(prefix="catalog_load_")
+    try:
+        with trace_span("write chunks", "catalog_load"):
+            rows, files = write_csv_chunks(csv_path, local_dir, chunk_rows)
+        if rows == 0:
+            return {"rows": 0, "files": 0, "distinct": 0, "inserted": 0, "updated": 0}
+
+        session.sql(f"CREATE TEMPORARY STAGE IF NOT EXISTS {CATALOG_LOAD_STAGE}").collect()
+        with trace_span("PUT", "catalog_load", files=files):
+            session.file.put(os.path.join(local_dir, "*.csv.gz"), stage_path,
+                             auto_compress=False, overwrite=True, parallel=UPLOAD_PARALLEL)
+
+        session.sql(f"CREATE TEMPORARY TABLE {staging_table} LIKE {TEST_SCRIPTS_TABLE}").collect()
+        try:
+            session.sql(f"ALTER TABLE {staging_table} ADD COLUMN LOAD_FILE STRING, LOAD_ROW INT").collect()
+            file_columns = ", ".join(f"${position}" for position in range(1, len(columns) + 1))
+            with trace_span("COPY INTO", "catalog_load", rows=rows):
+                session.sql(f"""
+                    COPY INTO {staging_table} ({", ".join(columns)}, LOAD_FILE, LOAD_ROW)
+                    FROM (SELECT {file_columns}, METADATA$FILENAME, METADATA$FILE_ROW_NUMBER FROM {stage_path})
+                    FILE_FORMAT = (TYPE = CSV COMPRESSION = GZIP FIELD_OPTIONALLY_ENCLOSED_BY = '"'
+                                   EMPTY_FIELD_AS_NULL = TRUE)
+                    ON_ERROR = ABORT_STATEMENT
+                """).collect()
+            distinct = session.sql(f"SELECT COUNT(DISTINCT TS_ID) FROM {staging_table}").collect()[0][0]
+            with trace_span("MERGE", "catalog_load"):
+                merge_row = session.sql(build_merge_query(staging_table, columns)).collect()[0]
+        finally:
+            session.sql(f"DROP TABLE IF EXISTS {staging_table}").collect()
+            session.sql(f"REMOVE {stage_path}").collect()
+
+        return {
+            "rows": rows,
+            "files": files,
+            "distinct": int(distinct),
+            "inserted": int(merge_row[0]),
+            "updated": int(merge_row[1]) if len(merge_row) > 1 else 0,
+        }
+    finally:
+        shutil.rmtree(local_dir, ignore_errors=True)
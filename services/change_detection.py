@@ -0,0 +1,159 @@
+"""Functions for skipping validations of tables unchanged since their last passing run."""
+import re
+from collections import defaultdict
+
+from config.config import TEST_LOGS_TABLE, skipped_status, unchanged_expected_result, unchanged_actual_result
+from models.data_classes import TestResult
+from utils.db_utils import get_object_details
+
+# Table references after FROM / JOIN; only fully qualified db.schema.table names can be checked
+TABLE_REFERENCE_PATTERN = re.compile(r"\b(?:FROM|JOIN)\s+([^\s,()]+)", re.IGNORECASE)
+QUALIFIED_NAME_PATTERN = re.compile(r"^([A-Za-z_][\w$]*)\.([A-Za-z_][\w$]*)\.([A-Za-z_][\w$]*)$")
+# Keywords ending the table list that follows a FROM (JOIN and ON do not: their tables belong to the same list)
+FROM_LIST_END_PATTERN = re.compile(
+    r"(?:WHERE|GROUP|HAVING|QUALIFY|ORDER|LIMIT|UNION|MINUS|EXCEPT|INTERSECT|WINDOW)\b", re.IGNORECASE
+)
+
+def has_comma_separated_from(script):
+    """
+    Return True if a FROM clause of `script` lists several tables with commas ("FROM db.s.t1, db.s.t2").
+
+    TABLE_REFERENCE_PATTERN only sees the first table of such a list. The
+    scan stops at the keywords ending the clause; commas inside parentheses
+    (subqueries, function calls) are ignored and a comma in a string literal
+    counts, which only errs towards not skipping.
+    """
+    for match in re.finditer(r"\bFROM\b", script, re.IGNORECASE):
+        depth = 0
+        for index in range(match.end(), len(script)):
+            char = script[index]
+            if char == "(":
+                depth += 1
+            elif char == ")":
+                if depth == 0:
+                    break
+                depth -= 1
+            elif depth == 0:
+                if char == ";":
+                    break
+                if char == ",":
+                    return True
+                if not (script[index - 1].isalnum() or script[index - 1] in "_$") \
+                        and FROM_LIST_END_PATTERN.match(script, index):
+                    break
+    return False
+
+def extract_table_references(test_case):
+    """
+    Return the fully qualified (DB, SCHEMA, TABLE) names a test case reads.
+
+    Returns:
+        set: Upper-cased name tuples, or None if any reference is not a plain
+             db.schema.table name or a FROM clause lists several tables with
+             commas (such tests are never skipped)
+    """
+    scripts = [test_case.source_script, test_case.target_script, test_case.minus_query]
+    tables = set()
+    for script in scripts:
+        if not script or script.upper() == "N/A":
+            continue
+        if has_comma_separated_from(script):
+            return None
+        for reference in TABLE_REFERENCE_PATTERN.findall(script):
+            match = QUALIFIED_NAME_PATTERN.match(reference.rstrip(";"))
+            if not match:
+                return None
+            tables.add(tuple(part.upper() for part in match.groups()))
+    return tables or None
+
+def load_table_snapshots(session, tables):
+    """
+    Read LAST_ALTERED and ROW_COUNT of base tables with one INFORMATION_SCHEMA query per database.
+
+    Args:
+        session: Snowflake session
+        tables: Iterable of (DB, SCHEMA, TABLE) tuples
+
+    Returns:
+        dict: (DB, SCHEMA, TABLE) -> (last_altered, row_count)
+    """
+    tables_by_db = defaultdict(set)
+    for db, schema, table in tables:
+        tables_by_db[db].add(f"{schema}.{table}")
+
+    snapshots = {}
+    for db, names in tables_by_db.items():
+        name_list = ", ".join(f"'{name}'" for name in sorted(names))
+        query = f"""
+            SELECT TABLE_SCHEMA, TABLE_NAME, LAST_ALTERED::TIMESTAMP_NTZ AS LAST_ALTERED, ROW_COUNT
+            FROM {db}.INFORMATION_SCHEMA.TABLES
+            WHERE TABLE_TYPE = 'BASE TABLE'
+            AND TABLE_SCHEMA || '.' || TABLE_NAME IN ({name_list})
+        """
+        try:
+            rows = session.sql(query).collect()
+        except Exception as e:
+            # Database not readable: its tests simply run as usual
+            print(f"Change detection unavailable for {db}: {e}")
+            continue
+        for row in rows:
+            snapshots[(db, row['TABLE_SCHEMA'], row['TABLE_NAME'])] = (row['LAST_ALTERED'], row['ROW_COUNT'])
+    return snapshots
+
+def load_last_pass_times(session, ts_ids):
+    """Return TS_ID -> EXECUTION_DATE of its latest passing run, with one query."""
+    ts_ids = sorted(set(ts_ids))
+    if not ts_ids:
+        return {}
+    id_list = ", ".join(f"'{ts_id}'" for ts_id in ts_ids)
+    rows = session.sql(f"""
+        SELECT TS_ID, MAX(EXECUTION_DATE) AS LAST_PASS
+        FROM {TEST_LOGS_TABLE}
+        WHERE STATUS = 'Pass' AND TS_ID IN ({id_list})
+        GROUP BY TS_ID
+    """).collect()
+    return {row['TS_ID']: row['LAST_PASS'] for row in rows}
+
+def find_unchanged_test_cases(session, test_cases):
+    """
+    Find test cases whose tables were not altered since the test last passed.
+
+    Returns:
+        dict: TS_ID -> last passing EXECUTION_DATE for every test case that can be skipped
+    """
+    references = {}
+    for test_case in test_cases:
+        if len(test_case.ts_id.split('-')) != 7:
+            continue
+        tables = extract_table_references(test_case)
+        if tables:
+            references[test_case.ts_id] = tables
+    if not references:
+        return {}
+
+    last_pass_times = load_last_pass_times(session, references.keys())
+    snapshots = load_table_snapshots(
+        session, {table for ts_id, tables in references.items() if ts_id in last_pass_times for table in tables}
+    )
+
+    unchanged = {}
+    for ts_id, tables in references.items():
+        last_pass = last_pass_times.get(ts_id)
+        if last_pass is None:
+            continue
+        if all(table in snapshots and snapshots[table][0] is not None and snapshots[table][0] <= last_pass
+               for table in tables):
+            unchanged[ts_id] = last_pass
+    return unchanged
+
+def build_skipped_result(test_case, last_pass):
+    """Build the TEST_LOGS result of a test skipped because its tables are unchanged."""
+    return TestResult(
+        ts_id=test_case.ts_id,
+        validation_type=test_case.validation_type,
+        db_structure=f"{test_case.application_name}/{test_case.schema_name}/{get_object_details(test_case.ts_id)[2]}",
+        executed_query="N/A",
+        status=f"{skipped_status}",
+        expected_result=f"{unchanged_expected_result}",
+        actual_result=f"{unchanged_actual_result} (last pass: {last_pass})"
+    )
@@ -0,0 +1,155 @@
+"""Checkpoint journal of completed tests, used to resume interrupted runs (main.py --resume)."""
+import json
+import os
+import threading
+
+from config.config import TEST_LOGS_TABLE, CHECKPOINT_DIR, LOG_FLUSH_ROWS
+from models.data_classes import RunMetadata
+from services.test_logger import insert_log_values, deactivate_test_cases
+
+class CheckpointJournal:
+    """
+    Local, append-only journal of the tests a run completed, one JSON line per result.
+
+    Every RUN_ID gets its own file, <directory>/<RUN_ID>.jsonl, starting with
+    the run's RunMetadata. A line is written as soon as a result is logged, so
+    it also covers rows still waiting in the TEST_LOGS buffer when the process
+    dies: each line carries the row's VALUES tuple and resume_run inserts the
+    rows that never reached TEST_LOGS.
+    """
+
+    def __init__(self, run_metadata_map, directory=CHECKPOINT_DIR):
+        self.directory = directory
+        self._files = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        for metadata in run_metadata_map.values():
+            path = journal_path(metadata.run_id, directory)
+            is_new = not os.path.exists(path)
+            f = self._files[metadata.run_id] = open(path, "a", encoding="utf-8")
+            if is_new:
+                self._write(f, {
+                    "run_id": metadata.run_id, "database_name": metadata.database_name,
+                    "user_id": metadata.user_id, "execution_date": str(metadata.execution_date),
+                })
+
+    @staticmethod
+    def _write(f, entry):
+        f.write(json.dumps(entry) + "\n")
+        f.flush()
+
+    def record(self, result, metadata, log_values):
+        """Journal a logged result with the VALUES tuple of its TEST_LOGS row."""
+        entry = {"ts_id": result.ts_id, "status": result.status, "values": log_values}
+        with self._lock:
+            f = self._files.get(metadata.run_id)
+            if f is not None:
+                self._write(f, entry)
+
+    def close(self):
+        with self._lock:
+            for f in self._files.values():
+                f.close()
+            self._files = {}
+
+def journal_path(run_id, directory=CHECKPOINT_DIR):
+    """Path of the local journal of a RUN_ID."""
+    return os.path.join(directory, f"{run_id}.jsonl")
+
+def read_journal(run_id, directory=CHECKPOINT_DIR):
+    """
+    Read the local journal of a RUN_ID.
+
+    A line cut short by the process dying is ignored.
+
+    Returns:
+        tuple: (RunMetadata or None, dict of TS_ID -> (status, VALUES tuple)); both empty without a journal
+    """
+    path = journal_path(run_id, directory)
+    if not os.path.exists(path):
+        return None, {}
+    metadata = None
+    entries = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "ts_id" in entry:
+                entries[entry["ts_id"]] = (entry["status"], entry["values"])
+            elif "run_id" in entry:
+                metadata = RunMetadata(entry["user_id"], entry["execution_date"], entry["run_id"],
+                                       entry["database_name"])
+    return metadata, entries
+
+def load_logged_runs(session, run_ids):
+    """
+    Read the RunMetadata and completed TS_IDs of RUN_IDs back from TEST_LOGS with one query.
+
+    Returns:
+        tuple: (dict of RUN_ID -> RunMetadata, dict of RUN_ID -> set of logged TS_IDs)
+    """
+    run_id_list = ", ".join(f"'{run_id}'" for run_id in sorted(set(run_ids)))
+    rows = session.sql(f"""
+        SELECT RUN_ID, TS_ID, USER_ID, EXECUTION_DATE
+        FROM {TEST_LOGS_TABLE}
+        WHERE RUN_ID IN ({run_id_list})
+    """).collect()
+    run_metadata_map = {}
+    logged = {}
+    for row in rows:
+        run_id = row['RUN_ID']
+        logged.setdefault(run_id, set()).add(row['TS_ID'])
+        if run_id not in run_metadata_map:
+            run_metadata_map[run_id] = RunMetadata(
+                user_id=row['USER_ID'],
+                execution_date=row['EXECUTION_DATE'],
+                run_id=run_id,
+                database_name=run_id.rsplit('_', 1)[0]
+            )
+    return run_metadata_map, logged
+
+def resume_run(session, run_ids, directory=CHECKPOINT_DIR):
+    """
+    Rebuild the state of interrupted runs from TEST_LOGS and their local journals.
+
+    Journaled results missing from TEST_LOGS (rows lost from the log buffer)
+    are inserted first, and their passed tests deactivated, so afterwards
+    TEST_LOGS holds every completed test of the runs.
+
+    Args:
+        session: Snowflake session
+        run_ids: RUN_IDs to resume, at most one per database
+        directory: Folder of the local journals
+
+    Returns:
+        tuple: (dict of database name -> RunMetadata, set of completed TS_IDs, number of rows recovered from journals)
+
+    Raises:
+        ValueError: When a RUN_ID is neither in TEST_LOGS nor in a local journal, or two belong to one database
+    """
+    logged_metadata, logged = load_logged_runs(session, run_ids)
+    run_metadata_map = {}
+    completed = set()
+    recovered = []
+    for run_id in sorted(set(run_ids)):
+        journal_metadata, entries = read_journal(run_id, directory)
+        metadata = journal_metadata or logged_metadata.get(run_id)
+        if metadata is None:
+            raise ValueError(f"Nothing is known about RUN_ID {run_id}: it has no TEST_LOGS rows and no journal "
+                             f"in {directory}")
+        if metadata.database_name in run_metadata_map:
+            raise ValueError(f"More than one RUN_ID given for database {metadata.database_name}")
+        run_metadata_map[metadata.database_name] = metadata
+
+        logged_ts_ids = logged.get(run_id, set())
+        recovered += [(ts_id, status, values) for ts_id, (status, values) in entries.items()
+                      if ts_id not in logged_ts_ids]
+        completed |= logged_ts_ids | set(entries)
+
+    for start in range(0, len(recovered), LOG_FLUSH_ROWS):
+        chunk = recovered[start:start + LOG_FLUSH_ROWS]
+        insert_log_values(session, [values for _, _, values in chunk])
+        deactivate_test_cases(session, [ts_id for ts_id, status, _ in chunk if status == "Pass"])
+    return run_metadata_map, completed, len(recovered)
@@ -0,0 +1,154 @@
+"""Functions for resolving count scripts up front from table metadata or batched multi-count statements."""
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from services.change_detection import load_table_snapshots
+from utils.profiling import trace_span
+
+# Matches bare "SELECT COUNT(*) [AS alias] FROM ..." scripts that always return exactly one integer row
+SIMPLE_COUNT_PATTERN = re.compile(r"^\s*SELECT\s+COUNT\s*\(\s*(\*|1)\s*\)\s+(AS\s+\w+\s+)?FROM\s", re.IGNORECASE)
+UNBATCHABLE_PATTERN = re.compile(r"\b(GROUP\s+BY|UNION|MINUS|EXCEPT|INTERSECT|LIMIT|QUALIFY)\b", re.IGNORECASE)
+# Matches unfiltered "SELECT COUNT(*) [AS alias] FROM db.schema.table", answerable from table metadata
+BARE_COUNT_PATTERN = re.compile(
+    r"^\s*SELECT\s+COUNT\s*\(\s*(\*|1)\s*\)\s+(AS\s+\w+\s+)?FROM\s+"
+    r"([A-Za-z_][\w$]*)\.([A-Za-z_][\w$]*)\.([A-Za-z_][\w$]*)\s*;?\s*$",
+    re.IGNORECASE
+)
+
+# How a count was obtained, recorded per test in TEST_LOGS.COUNT_METHOD
+COUNT_METHOD_METADATA = "metadata"
+COUNT_METHOD_BATCHED = "batched"
+COUNT_METHOD_QUERY = "query"
+
+def is_batchable_count_script(script):
+    """Check whether a script is a simple single-row count that can be fused into a batch."""
+    if not script:
+        return False
+    return bool(SIMPLE_COUNT_PATTERN.match(script)) and not UNBATCHABLE_PATTERN.search(script)
+
+def bare_count_table(script):
+    """Return the (DB, SCHEMA, TABLE) of an unfiltered single-table count script, or None."""
+    match = BARE_COUNT_PATTERN.match(script or "")
+    if not match:
+        return None
+    return tuple(part.upper() for part in match.groups()[2:])
+
+def resolve_counts_from_metadata(session, scripts):
+    """
+    Answer unfiltered COUNT(*) scripts from INFORMATION_SCHEMA.TABLES.ROW_COUNT.
+
+    One metadata query is issued per database for the whole batch; views and
+    tables missing from the metadata are left for real execution.
+
+    Returns:
+        dict: script -> row count for every script answered from metadata
+    """
+    tables = {script: bare_count_table(script) for script in scripts}
+    tables = {script: table for script, table in tables.items() if table}
+    if not tables:
+        return {}
+    snapshots = load_table_snapshots(session, set(tables.values()))
+    return {
+        script: snapshots[table][1]
+        for script, table in tables.items()
+        if table in snapshots and snapshots[table][1] is not None
+    }
+
+def collect_count_scripts(test_cases):
+    """
+    Collect the distinct batchable source/target count scripts of count check test cases.
+
+    Args:
+        test_cases: List of TestCase objects
+
+    Returns:
+        list: Unique scripts in first-seen order
+    """
+    scripts = {}
+    for test_case in test_cases:
+        if test_case.validation_type.lower() != "count check":
+            continue
+        for script in (test_case.source_script, test_case.target_script):
+            if is_batchable_count_script(script):
+                scripts.setdefault(script, None)
+    return list(scripts)
+
+def build_count_batch_query(scripts):
+    """Combine count scripts into one statement returning one (SCRIPT_INDEX, COUNT_VALUE) row per script."""
+    selects = [
+        f"SELECT {index} AS SCRIPT_INDEX, ({script}) AS COUNT_VALUE"
+        for index, script in enumerate(scripts)
+    ]
+    return "\nUNION ALL\n".join(selects)
+
+def fetch_count_batch(session, scripts):
+    """
+    Execute one batch of count scripts in a single round trip.
+
+    One bad script fails the whole statement, so a failed batch is split in
+    half and each half retried, down to single scripts: only the scripts that
+    fail on their own are left out, and the per-test path then runs them and
+    reports their own error.
+
+    Args:
+        session: Snowflake session
+        scripts: List of batchable count scripts
+
+    Returns:
+        dict: script -> count for every script of the batch that succeeded
+    """
+    if not scripts:
+        return {}
+    try:
+        rows = session.sql(build_count_batch_query(scripts)).collect()
+    except Exception:
+        if len(scripts) == 1:
+            return {}
+        middle = len(scripts) // 2
+        counts = fetch_count_batch(session, scripts[:middle])
+        counts.update(fetch_count_batch(session, scripts[middle:]))
+        return counts
+    return {scripts[row['SCRIPT_INDEX']]: row['COUNT_VALUE'] for row in rows}
+
+def prefetch_count_results(session_pool, test_cases, batch_size, workers=1, use_metadata=True):
+    """
+    Resolve the count scripts of all count check test cases up front.
+
+    Unfiltered single-table counts are answered from table metadata (when
+    `use_metadata`); the remaining simple counts run as batched multi-count
+    statements. Anything else is left to per-test execution.
+
+    Args:
+        session_pool: SessionPool the batches are executed on
+        test_cases: List of TestCase objects
+        batch_size: Maximum number of scripts fused into one statement
+        workers: Number of batches executed concurrently
+        use_metadata: Answer bare COUNT(*) scripts from INFORMATION_SCHEMA
+
+    Returns:
+        dict: script -> (count, count method) for every resolved script
+    """
+    scripts = collect_count_scripts(test_cases)
+    prefetched_counts = {}
+    if use_metadata:
+        with session_pool.session() as session:
+            metadata_counts = resolve_counts_from_metadata(session, scripts)
+        prefetched_counts.update(
+            (script, (count, COUNT_METHOD_METADATA)) for script, count in metadata_counts.items()
+        )
+        scripts = [script for script in scripts if script not in metadata_counts]
+
+    batch_size = max(1, batch_size)
+    batches = [scripts[i:i + batch_size] for i in range(0, len(scripts), batch_size)]
+
+    def run_batch(batch):
+        with session_pool.session() as session:
+            with trace_span("count batch", "query", scripts=len(batch)):
+                return fetch_count_batch(session, batch)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="count-batch") as pool:
+        for batch_counts in pool.map(run_batch, batches):
+            prefetched_counts.update(
+                (script, (count, COUNT_METHOD_BATCHED)) for script, count in batch_counts.items()
+            )
+    return prefetched_counts
@@ -1,7 +1,53 @@
 """Functions for checking data refresh status."""
 from services.test_logger import update_test_status
 from models.data_classes import TestResult
-from config.config import TEST_SCRIPTS_TABLE, TEST_LOGS_TABLE
+from config.config import TEST_SCRIPTS_TABLE, TEST_LOGS_TABLE, REFRESH_BASELINE_LOOKBACK_DAYS, skipped_status
+
+# Run-wide index of table name -> (prev_source_count, prev_target_count); None means query TEST_LOGS per lookup
+_refresh_baselines = None
+
+def load_refresh_baselines(session, table_names=None, lookback_days=REFRESH_BASELINE_LOOKBACK_DAYS,
+                           exclude_run_ids=None):
+    """
+    Prefetch the latest passing SOURCE_COUNT/TARGET_COUNT of every table with one window-function query.
+
+    Must be called at run start, before any result of the current run is logged,
+    so the index matches what get_previous_test_results would return per lookup.
+
+    Args:
+        session: Snowflake session
+        table_names: Optional iterable of table names to restrict the index to
+        lookback_days: Optional number of days of TEST_LOGS to consider (prunes old micro-partitions)
+        exclude_run_ids: Optional RUN_IDs whose rows are ignored; lets a runner joining a distributed
+                         run load the baselines after other runners already logged results of that run
+
+    Returns:
+        dict: table name -> (prev_source_count, prev_target_count)
+    """
+    global _refresh_baselines
+    filters = ""
+    if table_names:
+        name_list = ", ".join(f"'{name}'" for name in sorted(set(table_names)))
+        filters += f"\n    AND SPLIT_PART(TS_ID, '-', 6) IN ({name_list})"
+    if lookback_days:
+        filters += f"\n    AND EXECUTION_DATE >= DATEADD(DAY, -{int(lookback_days)}, CURRENT_TIMESTAMP())"
+    if exclude_run_ids:
+        run_id_list = ", ".join(f"'{run_id}'" for run_id in sorted(set(exclude_run_ids)))
+        filters += f"\n    AND RUN_ID NOT IN ({run_id_list})"
+
+    baseline_query = f"""
+    SELECT SPLIT_PART(TS_ID, '-', 6) AS TABLE_NAME, SOURCE_COUNT, TARGET_COUNT
+    FROM {TEST_LOGS_TABLE}
+    WHERE TS_ID LIKE '%-%-%-%-%-%-Count'
+    AND STATUS NOT IN ('Error', 'Fail', '{skipped_status}'){filters}
+    QUALIFY ROW_NUMBER() OVER (PARTITION BY SPLIT_PART(TS_ID, '-', 6) ORDER BY EXECUTION_DATE DESC) = 1
+    """
+    rows = session.sql(baseline_query).collect()
+    _refresh_baselines = {
+        row['TABLE_NAME']: (row['SOURCE_COUNT'], row['TARGET_COUNT'])
+        for row in rows
+    }
+    return _refresh_baselines
 
 def get_previous_test_results(session, table_name, run_metadata=None):
     """
@@ -15,6 +61,11 @@ def get_previous_test_results(session, table_name, run_metadata=None):
         tuple: (prev_source_count, prev_target_count) if results found, or (None, None) if not found
         str: Error message if an exception occurs, None otherwise
     """
+    # Use the prefetched baseline index when it was loaded at run start
+    if _refresh_baselines is not None:
+        prev_source_count, prev_target_count = _refresh_baselines.get(table_name, (None, None))
+        return prev_source_count, prev_target_count, "N/A"
+
     # Query to get the most recent test results for the table
     current_run_id = run_metadata.run_id
     # print(f"current_run_id:{current_run_id}")
@@ -22,7 +73,7 @@ def get_previous_test_results(session, table_name, run_metadata=None):
     SELECT SOURCE_COUNT, TARGET_COUNT, EXECUTION_DATE 
     FROM {TEST_LOGS_TABLE}
     WHERE TS_ID LIKE '%-%-%-%-%-{table_name}-Count'
-    AND STATUS NOT IN ('Error', 'Fail') AND RUN_ID !='{current_run_id}'
+    AND STATUS NOT IN ('Error', 'Fail', '{skipped_status}') AND RUN_ID !='{current_run_id}'
     ORDER BY EXECUTION_DATE DESC
     LIMIT 1;
     """
@@ -0,0 +1,87 @@
+"""Functions for executing test cases in parallel across a pool of sessions."""
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from models.data_classes import TestResult
+from services.test_executor import execute_test_case
+from services.test_logger import log_test_result
+from utils.profiling import trace_span
+
+def _run_on_pool(session_pool, test_case, run_metadata, prefetched_counts):
+    """Borrow a session from the pool and execute a single test case on it."""
+    with session_pool.session() as session:
+        with trace_span(test_case.ts_id, "test", validation_type=test_case.validation_type) as span_args:
+            status = execute_test_case(session, test_case, run_metadata, prefetched_counts)
+            span_args["status"] = status
+            return status
+
+def _log_unexpected_error(session_pool, test_case, run_metadata, error):
+    """
+    Report and log a test whose failure escaped execute_test_case (e.g. no pooled session could be created).
+
+    An Error row is logged so the failure shows up in TEST_LOGS (and the
+    checkpoint journal) with its error text instead of only in the run's count.
+    """
+    error_msg = str(error).replace("'", "''")
+    print(f"⚠️ {test_case.ts_id} failed outside test execution: {type(error).__name__}: {error}")
+    result = TestResult(
+        ts_id=test_case.ts_id,
+        validation_type=test_case.validation_type,
+        db_structure="N/A",
+        executed_query="N/A",
+        status="Error",
+        error_description=f"Test execution failed: {error_msg}"
+    )
+    try:
+        with session_pool.session() as session:
+            log_test_result(session, result, run_metadata)
+    except Exception as e:
+        print(f"❌ Could not log the error of {test_case.ts_id}: {e}")
+
+def execute_test_cases_parallel(session_pool, test_cases_by_db, run_metadata_map, workers, progress_bar=None,
+                                prefetched_counts=None, schedule=None):
+    """
+    Execute test cases concurrently, one pooled session per worker.
+
+    Args:
+        session_pool: SessionPool the workers borrow sessions from
+        test_cases_by_db: dict of database name -> list of TestCase objects
+        run_metadata_map: dict of database name -> RunMetadata object
+        workers: Number of worker threads
+        progress_bar: Optional tqdm progress bar, updated as tests finish
+        prefetched_counts: Optional dict of count script -> (count, method) from services/count_batcher
+        schedule: Optional list of (database name, TestCase) pairs in submission order (services/scheduler);
+                  workers pick tests up in this order. Defaults to the order of test_cases_by_db
+
+    Returns:
+        list: Status ("Pass", "Fail" or "Error") of every executed test case
+    """
+    results = []
+    pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="test-worker")
+    try:
+        if schedule is None:
+            schedule = [(db_name, test_case)
+                        for db_name, db_test_cases in test_cases_by_db.items() for test_case in db_test_cases]
+        futures = {}
+        for db_name, test_case in schedule:
+            future = pool.submit(_run_on_pool, session_pool, test_case, run_metadata_map[db_name], prefetched_counts)
+            futures[future] = (db_name, test_case)
+
+        for future in as_completed(futures):
+            db_name, test_case = futures[future]
+            try:
+                status = future.result()
+            except Exception as e:
+                # execute_test_case logs its own failures; anything escaping it is reported and logged here
+                _log_unexpected_error(session_pool, test_case, run_metadata_map[db_name], e)
+                status = "Error"
+            results.append(status)
+            if progress_bar is not None:
+                progress_bar.update(1)
+                progress_bar.set_postfix_str(f"DB: {db_name} - Last: {status}")
+    except BaseException:
+        # On Ctrl-C or any other abort, drop queued tests and let running ones finish so their logs are buffered
+        pool.shutdown(wait=True, cancel_futures=True)
+        raise
+    pool.shutdown(wait=True)
+
+    return results
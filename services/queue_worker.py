@@ -0,0 +1,86 @@
+"""Runner loop of distributed runs: claim test cases from TEST_QUEUE, execute them and complete the claim."""
+import time
+
+from config.config import QUEUE_CLAIM_BATCH_SIZE, QUEUE_POLL_SECONDS, COUNT_BATCH_SIZE, COUNT_METADATA_FAST_PATH
+from services.count_batcher import prefetch_count_results
+from services.parallel_executor import execute_test_cases_parallel
+from services.test_fetcher import fetch_test_cases_by_ids
+from services.test_logger import get_log_buffer
+from services.work_queue import new_worker_id, claim_batch, complete_batch, queue_progress, LeaseKeeper
+from utils.db_utils import create_session
+from utils.profiling import trace_span
+
+def run_queue_worker(session, session_pool, queue_id, progress_bar=None, batch_size=QUEUE_CLAIM_BATCH_SIZE,
+                     poll_seconds=QUEUE_POLL_SECONDS):
+    """
+    Work on a distributed run until none of its test cases is left to claim.
+
+    Claims a batch, executes it on the session pool and writes its TEST_LOGS
+    rows together with the completion of the claim (services/work_queue
+    complete_batch). While other runners still hold live leases this runner
+    keeps polling, so it picks up the work of a runner that crashes.
+
+    Results are held by the log buffer until their claim completes, so it must
+    be enabled with auto_flush=False. Results of a claim that never completes
+    (e.g. Ctrl-C) are discarded: its lease expires and another runner reruns it.
+
+    Args:
+        session: Snowflake session used for claims and completions
+        session_pool: SessionPool the tests are executed on
+        queue_id: ID of the distributed run
+        progress_bar: Optional tqdm progress bar, updated as tests finish
+        batch_size: Test cases claimed at a time
+        poll_seconds: Wait between claim attempts while other runners hold every remaining test
+
+    Returns:
+        tuple: (statuses of the tests this runner executed, number of results dropped because a lease was lost,
+                final queue_progress summary)
+    """
+    log_buffer = get_log_buffer()
+    if log_buffer is None or log_buffer.auto_flush:
+        raise RuntimeError("Distributed runs need the log buffer enabled with auto_flush=False")
+
+    worker_id = new_worker_id()
+    statuses = []
+    dropped = 0
+    # Leases are renewed on their own session, so renewals never wait behind a claim or show up in a test's query IDs
+    lease_session = create_session()
+    lease_keeper = LeaseKeeper(lease_session, queue_id)
+    try:
+        while True:
+            with trace_span("claim batch", "queue") as span_args:
+                claim_token, claimed, run_metadata_map = claim_batch(session, queue_id, worker_id, batch_size)
+                span_args["tests"] = len(claimed)
+            if not claimed:
+                progress = queue_progress(session, queue_id)
+                if progress["claimable"]:
+                    continue
+                if not progress["in_progress"]:
+                    return statuses, dropped, progress
+                time.sleep(poll_seconds)
+                continue
+            lease_keeper.hold(claim_token)
+
+            test_cases = {tc.ts_id: tc for tc in fetch_test_cases_by_ids(session, [ts_id for _, ts_id in claimed])}
+            schedule = [(db_name, test_cases[ts_id]) for db_name, ts_id in claimed if ts_id in test_cases]
+            if len(schedule) < len(claimed):
+                print(f"⚠️ {len(claimed) - len(schedule)} claimed test case(s) no longer exist in TEST_SCRIPTS.")
+
+            prefetched_counts = prefetch_count_results(
+                session_pool, [tc for _, tc in schedule], COUNT_BATCH_SIZE, session_pool.size, COUNT_METADATA_FAST_PATH
+            )
+            batch_statuses = execute_test_cases_parallel(
+                session_pool, {}, run_metadata_map, session_pool.size, progress_bar, prefetched_counts, schedule
+            )
+
+            lease_keeper.hold(None)
+            with trace_span("complete batch", "queue", tests=len(claimed)):
+                completed = complete_batch(session, queue_id, claim_token, log_buffer.drain())
+            if completed < len(claimed):
+                print(f"⚠️ Lease lost for {len(claimed) - completed} test case(s); another runner re-executes them.")
+                dropped += len(claimed) - completed
+            statuses += batch_statuses
+    finally:
+        log_buffer.drain()
+        lease_keeper.stop()
+        lease_session.close()
@@ -0,0 +1,119 @@
+"""Functions for rebuilding PDF reports on demand from rows stored in TEST_LOGS."""
+import io
+import json
+import os
+
+from config.config import TEST_LOGS_TABLE, REPORT_OUTPUT_DIR
+from models.data_classes import TestResult, RunMetadata
+from services.test_logger import build_result_file_path
+from utils.pdf_generator import create_pdf_report
+from utils.timing import PHASES
+
+def _value_or_null(value):
+    """TEST_LOGS NULLs map back to the "NULL" placeholder used by TestResult."""
+    return "NULL" if value is None else value
+
+def _column_differences(value):
+    """COLUMN_DIFFERENCES JSON back to the (column, differing rows, example keys) tuples of TestResult."""
+    if not value:
+        return None
+    return [(column, diff_count, example_keys) for column, diff_count, example_keys in json.loads(value)]
+
+def fetch_logged_results(session, run_id=None, ts_id=None):
+    """
+    Fetch TEST_LOGS rows to rebuild reports for.
+
+    Args:
+        session: Snowflake session
+        run_id: Rebuild every test of this RUN_ID
+        ts_id: Rebuild this TS_ID (its latest run unless run_id is also given)
+
+    Returns:
+        list: (TestResult, RunMetadata) pairs
+    """
+    if not run_id and not ts_id:
+        raise ValueError("Either run_id or ts_id is required")
+
+    filters = []
+    if run_id:
+        filters.append(f"RUN_ID = '{run_id}'")
+    if ts_id:
+        filters.append(f"TS_ID = '{ts_id}'")
+    latest_only = "" if run_id else "\n        QUALIFY ROW_NUMBER() OVER (PARTITION BY TS_ID ORDER BY EXECUTION_DATE DESC) = 1"
+
+    query = f"""
+        SELECT *
+        FROM {TEST_LOGS_TABLE}
+        WHERE {' AND '.join(filters)}{latest_only}
+        ORDER BY TS_ID
+    """
+    rows = session.sql(query).collect()
+
+    logged_results = []
+    for row in rows:
+        row = row.as_dict()
+        result = TestResult(
+            ts_id=row['TS_ID'],
+            validation_type=row['VALIDATION_TYPE'],
+            db_structure=row.get('DB_STRUCTURE') or "N/A",
+            executed_query=row['EXECUTED_QUERY'] or "N/A",
+            source_count=_value_or_null(row['SOURCE_COUNT']),
+            target_count=_value_or_null(row['TARGET_COUNT']),
+            status=row['STATUS'],
+            expected_result=row['EXPECTED_RESULT'] or "NULL",
+            actual_result=row['ACTUAL_RESULT'] or "NULL",
+            minus_query_file_path=row['MINUS_QUERY_FILE_PATH'] or "N/A",
+            execution_time=row['EXECUTION_TIME'] or 0.0,
+            error_description=row['ERROR_DESCRIPTION'] or "N/A",
+            result_file_path=row['RESULT_FILE_PATH'] or "N/A",
+            source_only_count=_value_or_null(row.get('SOURCE_ONLY_COUNT')),
+            target_only_count=_value_or_null(row.get('TARGET_ONLY_COUNT')),
+            count_method=row.get('COUNT_METHOD') or "N/A",
+            phase_timings={
+                phase: row[f'{phase.upper()}_TIME'] for phase in PHASES
+                if row.get(f'{phase.upper()}_TIME') is not None
+            },
+            query_ids=[query_id for query_id in (row.get('QUERY_IDS') or "").split(",") if query_id],
+            column_differences=_column_differences(row.get('COLUMN_DIFFERENCES'))
+        )
+        metadata = RunMetadata(
+            user_id=row['USER_ID'],
+            execution_date=row['EXECUTION_DATE'],
+            run_id=row['RUN_ID'],
+            database_name=row['RUN_ID'].rsplit('_', 1)[0]
+        )
+        logged_results.append((result, metadata))
+    return logged_results
+
+def regenerate_reports(session, run_id=None, ts_id=None, output_dir=REPORT_OUTPUT_DIR, upload=False):
+    """
+    Rebuild create_pdf_report output for logged results.
+
+    Reports are written to `output_dir`. With `upload`, each report is also put
+    on the results stage: at its recorded RESULT_FILE_PATH, or at a new path
+    (which is then written back to TEST_LOGS) when the run skipped the report.
+
+    Returns:
+        list: Local paths of the regenerated reports
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    written = []
+    for result, metadata in fetch_logged_results(session, run_id, ts_id):
+        pdf_content = create_pdf_report(result, metadata)
+
+        local_path = os.path.join(output_dir, f"TS_{result.ts_id}_{metadata.run_id}_Test_Results.pdf")
+        with open(local_path, "wb") as f:
+            f.write(pdf_content)
+        written.append(local_path)
+
+        if upload:
+            pdf_file_path = result.result_file_path
+            if pdf_file_path == "N/A":
+                pdf_file_path = build_result_file_path(result.ts_id)
+                session.sql(f"""
+                    UPDATE {TEST_LOGS_TABLE}
+                    SET RESULT_FILE_PATH = '{pdf_file_path}'
+                    WHERE RUN_ID = '{metadata.run_id}' AND TS_ID = '{result.ts_id}'
+                """).collect()
+            session.file.put_stream(io.BytesIO(pdf_content), pdf_file_path, auto_compress=False, overwrite=True)
+    return written
@@ -0,0 +1,189 @@
+"""Background rendering and upload of PDF test reports."""
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from config.config import PDF_RENDER_WORKERS, TEST_LOGS_TABLE, LOG_FLUSH_ROWS
+from utils.profiling import get_trace_recorder
+
+def render_report(result, metadata):
+    """Render one report in a worker process and return (PDF bytes, render seconds, worker pid)."""
+    from utils.pdf_generator import create_pdf_report
+    start = time.perf_counter()
+    pdf_content = create_pdf_report(result, metadata)
+    return pdf_content, time.perf_counter() - start, os.getpid()
+
+class ReportRenderer:
+    """
+    Renders PDF reports in a process pool and hands them to a StageUploader.
+
+    `submit` returns immediately, so test execution never waits on ReportLab.
+    Each render worker builds the report styles once (init_report_worker).
+    Call `join` before the run exits to wait for outstanding reports, then
+    close the uploader.
+
+    TEST_LOGS rows are written with the report's stage path before the report
+    exists, and usually before its render and upload finished. Both are
+    recorded as they happen (record_report_timing, record_failed_report), and
+    write_report_updates writes RENDER_TIME / UPLOAD_TIME and, for reports that
+    failed to render or upload, RESULT_FILE_PATH = 'N/A' once the run's rows
+    are flushed.
+    """
+
+    def __init__(self, uploader, workers=PDF_RENDER_WORKERS):
+        # Imported here so runs that never render reports do not load ReportLab
+        from utils.pdf_generator import init_report_worker
+        self._uploader = uploader
+        self._render_pool = ProcessPoolExecutor(
+            max_workers=max(1, workers),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_report_worker
+        )
+        self._upload_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="report-handoff")
+        self._pending = []
+        self._lock = threading.Lock()
+
+    def submit(self, result, metadata, pdf_file_path):
+        """Queue a report for rendering and upload to `pdf_file_path`."""
+        render_future = self._render_pool.submit(render_report, result, metadata)
+        upload_future = self._upload_pool.submit(self._upload, result, metadata, render_future, pdf_file_path)
+        with self._lock:
+            self._pending.append(upload_future)
+
+    def _upload(self, result, metadata, render_future, pdf_file_path):
+        """Wait for a rendered report and queue it for upload to the results stage."""
+        try:
+            self._hand_off(result, metadata, render_future, pdf_file_path)
+        except Exception:
+            # Counted by join; the logged row must not keep the path of a report that was never rendered
+            record_failed_report(metadata.run_id, result.ts_id, pdf_file_path)
+            raise
+
+    def _hand_off(self, result, metadata, render_future, pdf_file_path):
+        """Record the render of a finished report and add it to the uploader."""
+        pdf_content, render_seconds, render_pid = render_future.result()
+        result.phase_timings["render"] = render_seconds
+        record_report_timing(metadata.run_id, result.ts_id, pdf_file_path, "render", render_seconds)
+        trace_recorder = get_trace_recorder()
+        if trace_recorder is not None:
+            # Worker clocks are not comparable; the render ended (about) when its result arrived here
+            finished = time.perf_counter()
+            trace_recorder.complete(
+                "render", "phase", finished - render_seconds, finished, {"ts_id": result.ts_id},
+                pid=render_pid, tid=render_pid, thread_name=f"PDF render worker {render_pid}"
+            )
+
+        def record_upload(upload_seconds):
+            result.phase_timings["upload"] = upload_seconds
+            record_report_timing(metadata.run_id, result.ts_id, pdf_file_path, "upload", upload_seconds)
+
+        def record_failed_upload():
+            record_failed_report(metadata.run_id, result.ts_id, pdf_file_path)
+
+        # PDFs are already deflate-compressed, so they are stored as-is under the recorded path
+        self._uploader.add(pdf_content, pdf_file_path, compress=False, on_uploaded=record_upload,
+                           on_failed=record_failed_upload)
+
+    def join(self):
+        """
+        Wait for every queued report and shut the pools down.
+
+        Returns:
+            int: Number of reports that failed to render
+        """
+        with self._lock:
+            pending, self._pending = self._pending, []
+        failed = 0
+        for future in pending:
+            try:
+                future.result()
+            except Exception as e:
+                failed += 1
+                print(f"Error rendering PDF result: {e}")
+        self._upload_pool.shutdown(wait=True)
+        self._render_pool.shutdown(wait=True)
+        return failed
+
+# Run-wide renderer; None means reports are rendered and uploaded synchronously
+_report_renderer = None
+
+def start_report_renderer(uploader, workers=PDF_RENDER_WORKERS):
+    """Render reports in the background for the rest of the run, uploading them through `uploader`."""
+    global _report_renderer
+    _report_renderer = ReportRenderer(uploader, workers)
+    return _report_renderer
+
+def get_report_renderer():
+    """Return the active ReportRenderer, or None when rendering is synchronous."""
+    return _report_renderer
+
+def join_report_renderer():
+    """Wait for outstanding reports. Safe to call when no renderer was started."""
+    global _report_renderer
+    if _report_renderer is None:
+        return 0
+    renderer, _report_renderer = _report_renderer, None
+    return renderer.join()
+
+# Outcome of background reports per (RUN_ID, TS_ID, RESULT_FILE_PATH), written back by write_report_updates
+_report_updates = {}
+_report_updates_lock = threading.Lock()
+
+def _report_update(run_id, ts_id, pdf_file_path):
+    return _report_updates.setdefault((run_id, ts_id, pdf_file_path), {"failed": False, "render": None, "upload": None})
+
+def record_report_timing(run_id, ts_id, pdf_file_path, phase, seconds):
+    """Remember the render or upload seconds of a logged report for write_report_updates."""
+    with _report_updates_lock:
+        _report_update(run_id, ts_id, pdf_file_path)[phase] = seconds
+
+def record_failed_report(run_id, ts_id, pdf_file_path):
+    """Remember a logged report that was not saved, so write_report_updates resets its RESULT_FILE_PATH."""
+    with _report_updates_lock:
+        _report_update(run_id, ts_id, pdf_file_path)["failed"] = True
+
+def _seconds_or_null(seconds):
+    return "NULL" if seconds is None else f"{round(seconds, 3)}"
+
+def write_report_updates(session):
+    """
+    Write the recorded outcome of background reports to their TEST_LOGS rows.
+
+    Sets RENDER_TIME / UPLOAD_TIME (kept when unknown) and, for reports that
+    failed, RESULT_FILE_PATH = 'N/A'. Call it after the run's TEST_LOGS rows
+    are flushed: rows are matched on RUN_ID, TS_ID and the recorded path, with
+    one UPDATE per LOG_FLUSH_ROWS reports. A failed UPDATE keeps the reports
+    recorded, so a later call retries them.
+    """
+    global _report_updates
+    with _report_updates_lock:
+        updates, _report_updates = list(_report_updates.items()), {}
+    for start in range(0, len(updates), LOG_FLUSH_ROWS):
+        chunk = updates[start:start + LOG_FLUSH_ROWS]
+        values = ", ".join(
+            "('{}', '{}', '{}', {}, {}, {})".format(
+                run_id, ts_id, path.replace("'", "''"), "TRUE" if update["failed"] else "FALSE",
+                _seconds_or_null(update["render"]), _seconds_or_null(update["upload"])
+            )
+            for (run_id, ts_id, path), update in chunk
+        )
+        try:
+            session.sql(f"""
+                UPDATE {TEST_LOGS_TABLE} AS L
+                SET RESULT_FILE_PATH = IFF(V.FAILED, 'N/A', L.RESULT_FILE_PATH),
+                    RENDER_TIME = COALESCE(V.RENDER_TIME, L.RENDER_TIME),
+                    UPLOAD_TIME = COALESCE(V.UPLOAD_TIME, L.UPLOAD_TIME)
+                FROM (
+                    SELECT COLUMN1 AS RUN_ID, COLUMN2 AS TS_ID, COLUMN3 AS RESULT_FILE_PATH, COLUMN4::BOOLEAN AS FAILED,
+                           COLUMN5::FLOAT AS RENDER_TIME, COLUMN6::FLOAT AS UPLOAD_TIME
+                    FROM VALUES {values}
+                ) AS V
+                WHERE L.RUN_ID = V.RUN_ID AND L.TS_ID = V.TS_ID AND L.RESULT_FILE_PATH = V.RESULT_FILE_PATH
+            """).collect()
+        except Exception:
+            with _report_updates_lock:
+                for key, update in updates[start:]:
+                    _report_updates.setdefault(key, update)
+            raise
@@ -0,0 +1,107 @@
+"""Functions for ordering test execution by historical run time (longest processing time first)."""
+import heapq
+import statistics
+from collections import defaultdict
+
+from config.config import TEST_LOGS_TABLE, SCHEDULER_HISTORY_RUNS, SCHEDULER_DEFAULT_ESTIMATE_SECONDS, skipped_status
+from utils.db_utils import get_object_details
+
+def load_execution_history(session, history_runs=SCHEDULER_HISTORY_RUNS):
+    """
+    Average EXECUTION_TIME of the latest runs of every TS_ID, with one query.
+
+    Skipped rows are ignored: they did no work and would make a test look cheap.
+
+    Args:
+        session: Snowflake session
+        history_runs: Number of most recent runs averaged per TS_ID
+
+    Returns:
+        dict: TS_ID -> estimated seconds
+    """
+    rows = session.sql(f"""
+        SELECT TS_ID, AVG(EXECUTION_TIME) AS ESTIMATE
+        FROM (
+            SELECT TS_ID, EXECUTION_TIME
+            FROM {TEST_LOGS_TABLE}
+            WHERE STATUS <> '{skipped_status}' AND EXECUTION_TIME IS NOT NULL
+            QUALIFY ROW_NUMBER() OVER (PARTITION BY TS_ID ORDER BY EXECUTION_DATE DESC) <= {int(history_runs)}
+        )
+        GROUP BY TS_ID
+    """).collect()
+    return {row['TS_ID']: float(row['ESTIMATE']) for row in rows}
+
+def estimate_durations(test_cases, history, default_estimate=SCHEDULER_DEFAULT_ESTIMATE_SECONDS):
+    """
+    Estimate the run time of every test case.
+
+    Tests without history get the median estimate of their validation type,
+    or `default_estimate` when no test of that type has history either.
+
+    Returns:
+        dict: TS_ID -> estimated seconds
+    """
+    known_by_type = defaultdict(list)
+    for test_case in test_cases:
+        if test_case.ts_id in history:
+            known_by_type[test_case.validation_type.lower()].append(history[test_case.ts_id])
+    type_defaults = {
+        validation_type: statistics.median(estimates) for validation_type, estimates in known_by_type.items()
+    }
+    return {
+        test_case.ts_id: history.get(
+            test_case.ts_id, type_defaults.get(test_case.validation_type.lower(), default_estimate)
+        )
+        for test_case in test_cases
+    }
+
+def _table_group_key(test_case):
+    """Tests of the same DB.SCHEMA.TABLE (e.g. its count and data check) form one group."""
+    if len(test_case.ts_id.split('-')) != 7:
+        return (test_case.ts_id,)
+    DB, SCH, TAB, OP = get_object_details(test_case.ts_id)
+    return (DB, SCH, TAB)
+
+def build_schedule(test_cases_by_db, estimates):
+    """
+    Order every test case longest-first, keeping tests of the same table together.
+
+    Tests are grouped by table and the groups are ordered by their total
+    estimate, longest first; within a group the longest test comes first.
+    Adjacent tests of one table then run at about the same time, while the
+    warehouse still caches its data, and the longest work is never left for the
+    end of the run.
+
+    Args:
+        test_cases_by_db: dict of database name -> list of TestCase objects
+        estimates: dict of TS_ID -> estimated seconds
+
+    Returns:
+        list: (database name, TestCase) pairs in submission order
+    """
+    groups = defaultdict(list)
+    for db_name, db_test_cases in test_cases_by_db.items():
+        for test_case in db_test_cases:
+            groups[(db_name,) + _table_group_key(test_case)].append((db_name, test_case))
+
+    def group_total(entries):
+        return sum(estimates.get(test_case.ts_id, 0.0) for _, test_case in entries)
+
+    schedule = []
+    for entries in sorted(groups.values(), key=group_total, reverse=True):
+        entries.sort(key=lambda entry: estimates.get(entry[1].ts_id, 0.0), reverse=True)
+        schedule.extend(entries)
+    return schedule
+
+def predict_makespan(schedule, estimates, workers):
+    """
+    Simulate the worker pool on the estimates: each test starts on the first free worker.
+
+    Returns:
+        float: Predicted seconds until the last test finishes
+    """
+    worker_loads = [0.0] * max(1, workers)
+    for _, test_case in schedule:
+        earliest = heapq.heappop(worker_loads)
+        heapq.heappush(worker_loads, earliest + estimates.get(test_case.ts_id, 0.0))
+    return max(worker_loads)
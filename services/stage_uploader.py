@@ -0,0 +1,199 @@
+"""Asynchronous, batched upload of result artifacts to Snowflake stages."""
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+from config.config import UPLOAD_BATCH_SIZE, UPLOAD_FLUSH_SECONDS, UPLOAD_PARALLEL, UPLOAD_STAGING_PREFIX
+from utils.profiling import trace_span
+
+def split_stage_path(stage_path):
+    """Split '@STAGE/DB/SCH/TAB/OP/file.pdf' into ('@STAGE/DB/SCH/TAB/OP', 'file.pdf')."""
+    stage_dir, file_name = stage_path.rsplit("/", 1)
+    return stage_dir, file_name
+
+def split_stage_root(stage_path):
+    """Split '@STAGE/DB/SCH/TAB/OP/file.pdf' into ('@STAGE', 'DB/SCH/TAB/OP/file.pdf')."""
+    stage, _, relative_path = stage_path.partition("/")
+    return stage, relative_path
+
+def _is_valid_local_name(file_name):
+    """Stage file names may contain characters (e.g. ':') that Windows does not allow in local file names."""
+    return os.name != "nt" or not any(char in file_name for char in '<>:"\\|?*')
+
+def build_copy_files_query(stage, copies):
+    """
+    COPY FILES moving staged uploads to their final paths within the same stage.
+
+    Args:
+        stage: Stage name, e.g. '@DB.SCHEMA.STAGE'
+        copies: List of (stage path of the uploaded file, path relative to the stage it is copied to)
+    """
+    values = ",\n            ".join(
+        "('{}', '{}')".format(source.replace("'", "''"), target.replace("'", "''")) for source, target in copies
+    )
+    return f"""
+        COPY FILES INTO {stage}
+        FROM (SELECT COLUMN1, COLUMN2 FROM VALUES
+            {values})
+    """
+
+class StageUploader:
+    """
+    Stages artifacts in a local directory and uploads them in batches from a background thread.
+
+    Every artifact has its own stage directory (the {DB}/{SCH}/{TAB}/{OP}
+    layout), so a batch is not PUT directory by directory. Instead the whole
+    batch goes up with one wildcard PUT to a flat prefix of the stage
+    (UPLOAD_STAGING_PREFIX), one COPY FILES then copies every file to its
+    final path server-side and the prefix is removed: three round trips per
+    batch however many directories it spans. The stage file name is kept, so
+    the stage paths already recorded in TEST_LOGS match the uploaded files.
+    Call `close` at the end of the run to upload what is left.
+    """
+
+    def __init__(self, session, batch_size=UPLOAD_BATCH_SIZE, max_seconds=UPLOAD_FLUSH_SECONDS,
+                 parallel=UPLOAD_PARALLEL):
+        self._session = session
+        self.batch_size = max(1, batch_size)
+        self.max_seconds = max_seconds
+        self.parallel = max(1, parallel)
+        self.failed = 0
+        self._root = tempfile.mkdtemp(prefix="etl_artifacts_")
+        self._upload_id = uuid.uuid4().hex[:12]
+        self._pending = []
+        self._batch_number = 0
+        self._closing = False
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name="stage-uploader", daemon=True)
+        self._thread.start()
+
+    def add(self, content, stage_path, compress=False, on_uploaded=None, on_failed=None):
+        """
+        Queue bytes for upload to `stage_path`.
+
+        Args:
+            content: File content as bytes
+            stage_path: Full stage path of the file, e.g. '@STAGE/DB/SCH/TAB/OP/name.pdf'
+            compress: Gzip on upload (the stored file then gets a '.gz' suffix)
+            on_uploaded: Optional callback receiving the file's share of the seconds taken by the upload of its
+                batch (the batch time divided by its number of files)
+            on_failed: Optional callback called without arguments when the file could not be uploaded
+        """
+        stage_dir, file_name = split_stage_path(stage_path)
+        if _is_valid_local_name(file_name):
+            incoming_dir = os.path.join(self._root, "incoming")
+            os.makedirs(incoming_dir, exist_ok=True)
+            local_path = os.path.join(incoming_dir, f"{time.monotonic_ns()}_{threading.get_ident()}")
+            with open(local_path, "wb") as f:
+                f.write(content)
+            entry = (local_path, stage_path, compress, on_uploaded, on_failed)
+        else:
+            # Cannot be staged locally under its stage name; keep it in memory and stream it
+            entry = (content, stage_path, compress, on_uploaded, on_failed)
+
+        with self._condition:
+            self._pending.append(entry)
+            if len(self._pending) >= self.batch_size:
+                self._condition.notify()
+
+    def _run(self):
+        """Upload thread: flush a batch when it is full, when it is old enough, or when closing."""
+        while True:
+            with self._condition:
+                self._condition.wait_for(
+                    lambda: self._closing or len(self._pending) >= self.batch_size,
+                    timeout=self.max_seconds
+                )
+                batch, self._pending = self._pending[:self.batch_size], self._pending[self.batch_size:]
+                done = self._closing and not self._pending
+            if batch:
+                self._upload_batch(batch)
+            if done:
+                return
+
+    def _upload_batch(self, batch):
+        """Upload one batch: one PUT, COPY FILES and REMOVE per (stage, compression) group."""
+        self._batch_number += 1
+        batch_dir = os.path.join(self._root, f"batch_{self._batch_number}")
+        groups = {}
+        for local_path, stage_path, compress, on_uploaded, on_failed in batch:
+            if isinstance(local_path, bytes):
+                self._put_stream(local_path, stage_path, compress, on_uploaded, on_failed)
+                continue
+            stage, relative_path = split_stage_root(stage_path)
+            group = groups.get((stage, compress))
+            if group is None:
+                group = groups[(stage, compress)] = (os.path.join(batch_dir, str(len(groups))), [], [])
+                os.makedirs(group[0])
+            group_dir, copies, callbacks = group
+            # Numbered flat names keep files of different directories apart in the staging prefix
+            staged_name = f"{len(copies):06d}_{split_stage_path(stage_path)[1]}"
+            os.replace(local_path, os.path.join(group_dir, staged_name))
+            copies.append((staged_name, relative_path))
+            callbacks.append((on_uploaded, on_failed))
+
+        for (stage, compress), (group_dir, copies, callbacks) in groups.items():
+            staging_path = f"{stage}/{UPLOAD_STAGING_PREFIX}/{self._upload_id}_{self._batch_number}"
+            suffix = ".gz" if compress else ""
+            start = time.perf_counter()
+            try:
+                with trace_span("PUT", "upload", stage=stage, files=len(copies)):
+                    self._session.file.put(
+                        os.path.join(group_dir, "*"), staging_path,
+                        auto_compress=compress, overwrite=True, parallel=self.parallel
+                    )
+                with trace_span("COPY FILES", "upload", stage=stage, files=len(copies)):
+                    self._session.sql(build_copy_files_query(stage, [
+                        (f"{staging_path}/{staged_name}{suffix}", f"{relative_path}{suffix}")
+                        for staged_name, relative_path in copies
+                    ])).collect()
+                # Each file of the group is charged its share, so summing UPLOAD_TIME gives the real upload time
+                share = (time.perf_counter() - start) / len(copies)
+            except Exception as e:
+                self.failed += len(copies)
+                print(f"Error uploading artifacts to {stage}: {e}")
+                for _, on_failed in callbacks:
+                    if on_failed is not None:
+                        on_failed()
+                continue
+            finally:
+                try:
+                    self._session.sql(f"REMOVE {staging_path}/").collect()
+                except Exception as e:
+                    print(f"Error removing staged uploads {staging_path}: {e}")
+            for on_uploaded, _ in callbacks:
+                if on_uploaded is not None:
+                    on_uploaded(share)
+        shutil.rmtree(batch_dir, ignore_errors=True)
+
+    def _put_stream(self, content, stage_path, compress, on_uploaded=None, on_failed=None):
+        """Upload a single file straight from memory."""
+        start = time.perf_counter()
+        try:
+            self._session.file.put_stream(io.BytesIO(content), stage_path, auto_compress=compress)
+        except Exception as e:
+            self.failed += 1
+            print(f"Error uploading {stage_path}: {e}")
+            if on_failed is not None:
+                on_failed()
+            return
+        if on_uploaded is not None:
+            on_uploaded(time.perf_counter() - start)
+
+    def close(self):
+        """
+        Upload every queued artifact and stop the background thread.
+
+        Returns:
+            int: Number of artifacts that failed to upload
+        """
+        with self._condition:
+            self._closing = True
+            self._condition.notify()
+        self._thread.join()
+        shutil.rmtree(self._root, ignore_errors=True)
+        return self.failed
@@ -1,24 +1,43 @@
 """Functions for executing test cases."""
 import time
-import pandas as pd
-import io
+import uuid
 from datetime import datetime
 
 from models.data_classes import TestResult, TestCase
-from utils.db_utils import execute_query, get_object_details
-from config.config import MISMATCH_RESULTS_STAGE
+from utils.db_utils import execute_query, get_object_details, capture_query_ids
+from utils.timing import timed_phase
+from config.config import MISMATCH_RESULTS_STAGE, DATA_CHECK_FINGERPRINT, MISMATCH_EXPORT_MAX_ROWS
 from services.test_logger import log_test_result, update_test_status
 from services.data_refresh_check import check_data_refresh
-from utils.query_utils import clean_query
+from services.count_batcher import COUNT_METHOD_QUERY
+from utils.query_utils import clean_query, build_fingerprint_query, build_bucket_diff_query, restrict_to_buckets, \
+    split_column_list, build_column_diff_query, split_minus_query, select_column_list
 from config.config import TEST_SCRIPTS_TABLE, ts_id_error, mismatch_failed_case, mismatch_passed_case, \
     mismatch_expected_result, mismatch_data_not_refreshed, mismatch_data_refreshed_expected_result, count_failed_case, \
     count_expected_result, count_passed_case, count_data_refreshed_expected_result, count_data_refreshed, count_data_not_refreshed
 
-def execute_count_check(session, test_case, run_metadata=None):
+def get_count(session, script, description, prefetched_counts=None):
+    """
+    Return a script's count and how it was obtained.
+
+    Counts prefetched from table metadata or batched statements are reused;
+    anything else is executed directly.
+
+    Returns:
+        tuple: (count, count method) with method "metadata", "batched" or "query"
+    """
+    if prefetched_counts and script in prefetched_counts:
+        return prefetched_counts[script]
+    return execute_query(session, script, description), COUNT_METHOD_QUERY
+
+def execute_count_check(session, test_case, run_metadata=None, prefetched_counts=None):
     """Execute count check validation with data refresh verification."""
-    # Execute source and target queries to get counts
-    source_count = execute_query(session, test_case.source_script, "Source Query")
-    target_count = execute_query(session, test_case.target_script, "Target Query")
+    # Execute source and target queries to get counts (or reuse the batched results)
+    timings = {}
+    with timed_phase(timings, "source_query"):
+        source_count, source_method = get_count(session, test_case.source_script, "Source Query", prefetched_counts)
+    with timed_phase(timings, "target_query"):
+        target_count, target_method = get_count(session, test_case.target_script, "Target Query", prefetched_counts)
     
     # First check if counts match
     count_match_status = "Pass" if source_count == target_count else "Fail"
@@ -30,7 +49,9 @@ def execute_count_check(session, test_case, run_metadata=None):
         db_structure=f"{test_case.application_name}/{test_case.schema_name}/{get_object_details(test_case.ts_id)[2]}",
         executed_query=f"{test_case.source_script} | {test_case.target_script}",
         source_count=source_count,
-        target_count=target_count
+        target_count=target_count,
+        count_method=f"{source_method}|{target_method}",
+        phase_timings=timings
     )
     
     # Check if we need to perform data refresh validation
@@ -45,9 +66,10 @@ def execute_count_check(session, test_case, run_metadata=None):
     table_name = ts_id_parts[5]
     
     # Now check_data_refresh handles getting previous results internally
-    data_refreshed, (prev_source_count, prev_target_count) = check_data_refresh(
-        session, table_name, source_count, target_count, run_metadata
-    )
+    with timed_phase(timings, "refresh_check"):
+        data_refreshed, (prev_source_count, prev_target_count) = check_data_refresh(
+            session, table_name, source_count, target_count, run_metadata
+        )
     
     # Store previous counts in result for logging
     result.prev_source_count = prev_source_count
@@ -78,7 +100,99 @@ def execute_count_check(session, test_case, run_metadata=None):
     
     return result
 
-def execute_data_check(session, test_case, run_metadata=None):
+def fingerprints_match(session, source_query, target_query):
+    """
+    Compare row count and HASH_AGG fingerprint of source and target in one aggregate query.
+
+    Returns:
+        bool: True if both sides match, False if they differ or the fingerprint query failed
+    """
+    try:
+        row = session.sql(build_fingerprint_query(source_query, target_query)).collect()[0]
+    except Exception:
+        # Fall back to the full MINUS comparison
+        return False
+    return (row['SOURCE_ROWS'] == row['TARGET_ROWS']
+            and row['SOURCE_FINGERPRINT'] == row['TARGET_FINGERPRINT'])
+
+def export_mismatches(session, bidirectional_query, file_path, max_rows=MISMATCH_EXPORT_MAX_ROWS, timings=None):
+    """
+    Count and export mismatched rows without pulling them to the client.
+
+    The bidirectional diff is materialized once into a temporary table, counted
+    per DIFFERENCE_TYPE, and, if anything differs, unloaded with COPY INTO as a
+    single gzip-compressed CSV (capped at `max_rows` rows) to `file_path`.
+    Materializing counts as the diff_query phase in `timings`, the rest as export.
+
+    Returns:
+        tuple: (source_only_count, target_only_count)
+    """
+    diff_table = f"MISMATCH_DIFF_{uuid.uuid4().hex.upper()}"
+    with timed_phase(timings, "diff_query"):
+        session.sql(f"CREATE TEMPORARY TABLE {diff_table} AS {bidirectional_query}").collect()
+    with timed_phase(timings, "export"):
+        try:
+            counts = {
+                row['DIFFERENCE_TYPE']: row['ROW_COUNT']
+                for row in session.sql(
+                    f"SELECT DIFFERENCE_TYPE, COUNT(*) AS ROW_COUNT FROM {diff_table} GROUP BY DIFFERENCE_TYPE"
+                ).collect()
+            }
+            source_only = counts.get('Source_Only', 0)
+            target_only = counts.get('Target_Only', 0)
+
+            if source_only or target_only:
+                limit = f" LIMIT {int(max_rows)}" if max_rows else ""
+                session.sql(f"""
+                    COPY INTO '{file_path}'
+                    FROM (SELECT * FROM {diff_table}{limit})
+                    FILE_FORMAT = (TYPE = CSV COMPRESSION = GZIP FIELD_OPTIONALLY_ENCLOSED_BY = '"' NULL_IF = (''))
+                    HEADER = TRUE
+                    SINGLE = TRUE
+                    MAX_FILE_SIZE = 5368709120
+                    OVERWRITE = TRUE
+                """).collect()
+            return source_only, target_only
+        finally:
+            session.sql(f"DROP TABLE IF EXISTS {diff_table}").collect()
+
+def compute_column_differences(session, source_query, target_query, column_list, compare_key):
+    """
+    Localize a data check failure to columns with one server-side aggregate over a keyed join.
+
+    Args:
+        session: Snowflake session
+        source_query: Source SELECT parsed from the minus query
+        target_query: Target SELECT parsed from the minus query
+        column_list: Column list of the source SELECT; a * is resolved to the query's output columns
+        compare_key: Comma separated key column(s) to join source and target on
+
+    Returns:
+        list: (column, differing_row_count, example_keys) for every column with differences,
+              plus ("<key only in source>", n, []) / ("<key only in target>", n, []) entries
+    """
+    key_columns = [key.strip().upper() for key in compare_key.split(",") if key.strip()]
+    output_columns = split_column_list(column_list)
+    if "*" in output_columns:
+        # SELECT * (or T.*): resolve the real output columns; Snowpark only describes the query, no rows are read
+        output_columns = session.sql(f"SELECT * FROM ({source_query}) LIMIT 0").columns
+    # Column names are matched against the keys case-insensitively; the SQL keeps the names as written
+    compare_columns = [column for column in output_columns if column.upper() not in key_columns]
+    row = session.sql(build_column_diff_query(source_query, target_query, key_columns, compare_columns)).collect()[0]
+
+    differences = []
+    if row['SOURCE_ONLY']:
+        differences.append(("<key only in source>", row['SOURCE_ONLY'], []))
+    if row['TARGET_ONLY']:
+        differences.append(("<key only in target>", row['TARGET_ONLY'], []))
+    for index, column in enumerate(compare_columns):
+        diff_count = row[f'C{index}_DIFF']
+        if diff_count:
+            examples = [key for key in (row[f'C{index}_MIN_KEY'], row[f'C{index}_MAX_KEY']) if key is not None]
+            differences.append((column, diff_count, list(dict.fromkeys(examples))))
+    return differences
+
+def execute_data_check(session, test_case, run_metadata=None, prefetched_counts=None):
     """Execute data check validation using MINUS queries to check both sides."""
     result = TestResult(
         ts_id=test_case.ts_id,
@@ -87,6 +201,7 @@ def execute_data_check(session, test_case, run_metadata=None):
         executed_query=test_case.minus_query,
         expected_result=f"{mismatch_expected_result}"
     )
+    timings = result.phase_timings
     
     minus_query = test_case.minus_query
     
@@ -106,7 +221,8 @@ def execute_data_check(session, test_case, run_metadata=None):
     WHERE TS_ID LIKE '%-%-%-%-%-{table_name}-Count';
     """
     # Execute get_SourceScript_TargetScript to get required scripts.
-    script = session.sql(get_SourceScript_TargetScript).collect()
+    with timed_phase(timings, "refresh_check"):
+        script = session.sql(get_SourceScript_TargetScript).collect()
 
     if script:  # make sure the list is not empty
         row = script[0]  # get the first row
@@ -122,8 +238,9 @@ def execute_data_check(session, test_case, run_metadata=None):
         
         try:
             # Execute the count check queries to get current counts
-            source_count = execute_query(session, Check_test_case.source_script, "Source Query")
-            target_count = execute_query(session, Check_test_case.target_script, "Target Query")
+            with timed_phase(timings, "refresh_check"):
+                source_count, _ = get_count(session, Check_test_case.source_script, "Source Query", prefetched_counts)
+                target_count, _ = get_count(session, Check_test_case.target_script, "Target Query", prefetched_counts)
         except Exception as e:
             error_msg = f"Check {Check_test_case.ts_id} test case. Error Due to Data Refresh Functionality"+str(e).replace("'", "''")
             result.error_description = error_msg
@@ -131,9 +248,10 @@ def execute_data_check(session, test_case, run_metadata=None):
             return result
 
         # Now check if data is refreshed
-        data_refreshed, _ = check_data_refresh(
-            session, table_name, source_count, target_count, run_metadata
-        )
+        with timed_phase(timings, "refresh_check"):
+            data_refreshed, _ = check_data_refresh(
+                session, table_name, source_count, target_count, run_metadata
+            )
         
         if not data_refreshed:
             result.status = "Fail"
@@ -152,33 +270,59 @@ def execute_data_check(session, test_case, run_metadata=None):
     try:
         # Parse the MINUS query to extract source and target queries
         # We expect minus_query to be in format: "SELECT ... FROM A MINUS SELECT ... FROM B"
-        parts = minus_query.upper().split("MINUS")
+        # The split keeps the query's case: upper-casing would also rewrite string literals and quoted identifiers
+        parts = split_minus_query(minus_query)
         
-        if len(parts) < 2:
+        if parts is None:
             result.status = "Error"
             result.error_description = "Invalid MINUS query format"
             result.actual_result = "NULL"
             return result
             
-        # Extract column list from the first SELECT statement
-        source_query = parts[0].strip()
-        target_query = parts[1].strip()
+        source_query, target_query = parts
         
         # Extract columns from the source query (between SELECT and FROM)
-        select_from_parts = source_query.split("FROM", 1)
-        if len(select_from_parts) < 2:
+        column_list = select_column_list(source_query)
+        if column_list is None:
             result.status = "Error"
             result.error_description = "Invalid query format - cannot find FROM in source query"
             result.actual_result = "NULL"
             return result
+        
+        # Fast path: identical fingerprints mean no mismatch, so skip the MINUS query and export
+        if DATA_CHECK_FINGERPRINT:
+            with timed_phase(timings, "diff_query"):
+                fingerprints_equal = fingerprints_match(session, source_query, target_query)
+            if fingerprints_equal:
+                result.status = "Pass"
+                result.actual_result = f"{mismatch_passed_case}"
+                return result
+        
+        # Bucketed mode: compare per-bucket aggregates and run MINUS only on the buckets that differ
+        if test_case.bucket_count and test_case.bucket_count > 1 and test_case.bucket_key:
+            bucket_key = test_case.bucket_key
+            with timed_phase(timings, "diff_query"):
+                bucket_rows = session.sql(
+                    build_bucket_diff_query(source_query, target_query, bucket_key, test_case.bucket_count)
+                ).collect()
+            differing_buckets = [row['BUCKET'] for row in bucket_rows]
+            
+            if not differing_buckets:
+                result.status = "Pass"
+                result.actual_result = f"{mismatch_passed_case}"
+                return result
             
-        column_list = select_from_parts[0].replace("SELECT", "", 1).strip()
+            # Both halves keep the case of the test's query, so its literal filters still apply
+            source_query = restrict_to_buckets(source_query, bucket_key, test_case.bucket_count, differing_buckets)
+            target_query = restrict_to_buckets(target_query, bucket_key, test_case.bucket_count, differing_buckets)
         
         # Construct the bidirectional check query
         bidirectional_query = f"""
         SELECT 'Source_Only' AS DIFFERENCE_TYPE, {column_list}
         FROM (
-            {minus_query}
+            {source_query}
+            MINUS
+            {target_query}
         ) AS SOURCE_DIFF
         UNION ALL
         SELECT 'Target_Only' AS DIFFERENCE_TYPE, {column_list}
@@ -189,25 +333,32 @@ def execute_data_check(session, test_case, run_metadata=None):
         ) AS TARGET_DIFF
         """
         
-        minus_df = session.sql(bidirectional_query).toPandas()
+        # Materialize the differences server-side, count each side and unload straight to stage
+        DB, SCH, TAB, OP = get_object_details(test_case.ts_id)
+        timestamp = datetime.now().strftime("%Y-%m-%d_%H:%M:%S")
+        mismatch_file_path = f"{MISMATCH_RESULTS_STAGE}/{DB}/{SCH}/{TAB}/TS_{test_case.ts_id}_mismatch_results_{timestamp}.csv.gz"
+        source_only, target_only = export_mismatches(
+            session, bidirectional_query, mismatch_file_path, timings=timings
+        )
+        result.source_only_count = source_only
+        result.target_only_count = target_only
 
         # Check if there are mismatches
-        if not minus_df.empty:
-            # Convert DataFrame to CSV in memory
-            csv_buffer = io.BytesIO()
-            minus_df.to_csv(csv_buffer, index=False)
-            csv_buffer.seek(0)  # Reset buffer position
-            
-            # Generate a unique file name with a readable timestamp
-            DB, SCH, TAB, OP = get_object_details(test_case.ts_id)
-            timestamp = datetime.now().strftime("%Y-%m-%d_%H:%M:%S")
-            result.minus_query_file_path = f"{MISMATCH_RESULTS_STAGE}/{DB}/{SCH}/{TAB}/TS_{test_case.ts_id}_mismatch_results_{timestamp}.csv"
-
-            # Upload CSV to Snowflake stage
-            session.file.put_stream(csv_buffer, result.minus_query_file_path, auto_compress=False)
-            
+        if source_only or target_only:
+            result.minus_query_file_path = mismatch_file_path
             result.status = "Fail"
             result.actual_result = f"{mismatch_failed_case}"
+
+            # Keyed mode: report which columns differ and for which keys
+            if test_case.compare_key:
+                try:
+                    with timed_phase(timings, "diff_query"):
+                        result.column_differences = compute_column_differences(
+                            session, source_query, target_query, column_list, test_case.compare_key
+                        )
+                except Exception as e:
+                    error_msg = str(e).replace("'", "''")
+                    result.error_description = f"Column level comparison failed: {error_msg}"
         else:
             result.status = "Pass"
             result.actual_result = f"{mismatch_passed_case}"
@@ -221,8 +372,13 @@ def execute_data_check(session, test_case, run_metadata=None):
         result.actual_result = "NULL"
         return result
     
-def execute_test_case(session, test_case, run_metadata):
-    """Execute a single test case and log results."""
+def execute_test_case(session, test_case, run_metadata, prefetched_counts=None):
+    """
+    Execute a single test case and log results.
+
+    `prefetched_counts` maps count scripts to (count, method) results already
+    fetched by services/count_batcher; scripts missing from it are executed directly.
+    """
     # Initialize test result object
     result = TestResult(
         ts_id=test_case.ts_id,
@@ -244,23 +400,27 @@ def execute_test_case(session, test_case, run_metadata):
         log_test_result(session, result, run_metadata)
         return result.status
     
-    try:
-        # Execute appropriate test based on validation type
-        if test_case.validation_type.lower() == "count check":
-            result = execute_count_check(session, test_case, run_metadata)
+    # Record the IDs of the queries this test issues, so slow tests can be joined to QUERY_HISTORY
+    with capture_query_ids(session) as query_ids:
+        try:
+            # Execute appropriate test based on validation type
+            if test_case.validation_type.lower() == "count check":
+                result = execute_count_check(session, test_case, run_metadata, prefetched_counts)
             
-        elif test_case.validation_type.lower() == "data check":
-            result = execute_data_check(session, test_case, run_metadata)
+            elif test_case.validation_type.lower() == "data check":
+                result = execute_data_check(session, test_case, run_metadata, prefetched_counts)
             
-        else:
-            raise ValueError(f"Unsupported validation type: {test_case.validation_type}")
+            else:
+                raise ValueError(f"Unsupported validation type: {test_case.validation_type}")
     
-    except Exception as e:
-        result.status = "Error"
-        result.error_description = str(e).replace("'", "''")
-        result.executed_query = (f"{test_case.source_script} | {test_case.target_script}" 
-                               if test_case.validation_type.lower() == "count check" 
-                               else test_case.minus_query)
+        except Exception as e:
+            result.status = "Error"
+            result.error_description = str(e).replace("'", "''")
+            result.executed_query = (f"{test_case.source_script} | {test_case.target_script}" 
+                                   if test_case.validation_type.lower() == "count check" 
+                                   else test_case.minus_query)
+    
+    result.query_ids = query_ids
     
     result.execution_time = round(time.time() - start_time, 2)
     
@@ -1,68 +1,141 @@
 """Functions for fetching test cases from the database."""
+import sys
 import pandas as pd
 from config.config import TEST_SCRIPTS_TABLE, TEST_ACTIVE_FLAG, RUN_ID_TRACKER_TABLE
 from models.data_classes import TestCase, RunMetadata
-from utils.query_utils import clean_query
 
-def fetch_active_test_cases(session):
-    """Fetch all active test cases from the database."""
-    query = f"""
+TEST_CASES_QUERY = f"""
         SELECT TS_ID, APPLICATION_NAME, SCHEMA_NAME, 
                TRIM(VALIDATION_TYPE) AS VALIDATION_TYPE, 
                TRIM(SOURCE_SCRIPT) AS SOURCE_SCRIPT, 
                TRIM(TARGET_SCRIPT) AS TARGET_SCRIPT, 
-               TRIM(MINUS_QUERY) AS MINUS_QUERY
+               TRIM(MINUS_QUERY) AS MINUS_QUERY,
+               BUCKET_COUNT, TRIM(BUCKET_KEY) AS BUCKET_KEY,
+               TRIM(COMPARE_KEY) AS COMPARE_KEY
         FROM {TEST_SCRIPTS_TABLE}
-        WHERE ACTIVE_FLAG = '{TEST_ACTIVE_FLAG}'
     """
-    df = session.sql(query).toPandas()
-    
-    # Convert DataFrame rows to TestCase objects
-    test_cases = []
-    for _, row in df.iterrows():
-        test_case = TestCase(
-            ts_id=row['TS_ID'],
-            application_name=row['APPLICATION_NAME'],
-            schema_name=row['SCHEMA_NAME'],
-            validation_type=row['VALIDATION_TYPE'],
-            source_script=clean_query(row['SOURCE_SCRIPT']),
-            target_script=clean_query(row['TARGET_SCRIPT']),
-            minus_query=clean_query(row['MINUS_QUERY']) if pd.notna(row['MINUS_QUERY']) else ""
+
+ACTIVE_TEST_CASES_QUERY = f"""{TEST_CASES_QUERY}    WHERE ACTIVE_FLAG = '{TEST_ACTIVE_FLAG}'
+    """
+
+def _clean_scripts(column):
+    """Vectorized clean_query: NULL -> "" and surrounding semicolons removed."""
+    return column.fillna("").astype(str).str.strip(";")
+
+def _intern(value):
+    """Intern repeated name strings so each distinct value is stored once."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+def _test_cases_from_batch(df):
+    """Build TestCase objects column-wise from one result batch (no iterrows)."""
+    bucket_counts = pd.to_numeric(df['BUCKET_COUNT'], errors='coerce').fillna(0).astype(int)
+    columns = zip(
+        df['TS_ID'],
+        df['APPLICATION_NAME'],
+        df['SCHEMA_NAME'],
+        df['VALIDATION_TYPE'],
+        _clean_scripts(df['SOURCE_SCRIPT']),
+        _clean_scripts(df['TARGET_SCRIPT']),
+        _clean_scripts(df['MINUS_QUERY']),
+        bucket_counts,
+        df['BUCKET_KEY'].fillna(""),
+        df['COMPARE_KEY'].fillna("")
+    )
+    return [
+        TestCase(ts_id, _intern(application_name), _intern(schema_name), _intern(validation_type),
+                 source_script, target_script, minus_query, int(bucket_count), bucket_key, compare_key)
+        for (ts_id, application_name, schema_name, validation_type, source_script, target_script,
+             minus_query, bucket_count, bucket_key, compare_key) in columns
+    ]
+
+def iter_active_test_cases(session):
+    """
+    Stream active test cases batch by batch.
+
+    Rows are fetched with to_pandas_batches(), so only one result batch has to
+    be held in memory at a time, however large the catalog is.
+    """
+    for df in session.sql(ACTIVE_TEST_CASES_QUERY).to_pandas_batches():
+        yield from _test_cases_from_batch(df)
+
+def fetch_active_test_cases(session):
+    """Fetch all active test cases from the database."""
+    return list(iter_active_test_cases(session))
+
+def fetch_test_cases_by_ids(session, ts_ids):
+    """
+    Fetch the given test cases whatever their ACTIVE_FLAG.
+
+    Used by distributed runners for the TS_IDs they claimed from TEST_QUEUE: a
+    queued test may already be deactivated by the time it is claimed again
+    (e.g. its previous runner logged a pass, then lost its lease).
+
+    Returns:
+        list: TestCase objects; TS_IDs no longer in TEST_SCRIPTS are missing
+    """
+    ts_ids = sorted(set(ts_ids))
+    if not ts_ids:
+        return []
+    id_list = ", ".join(f"'{ts_id}'" for ts_id in ts_ids)
+    query = f"""{TEST_CASES_QUERY}    WHERE TS_ID IN ({id_list})
+    """
+    return [test_case for df in session.sql(query).to_pandas_batches() for test_case in _test_cases_from_batch(df)]
+
+def allocate_run_metadata(session, database_names):
+    """
+    Allocate RUN_IDs for all databases of a run in one atomic round trip.
+
+    A single anonymous Snowflake Scripting block increments (or creates) the
+    per-database counters with one MERGE and reads them back inside the same
+    transaction, together with CURRENT_USER() and CURRENT_TIMESTAMP(). MERGE
+    locks RUN_ID_TRACKER until COMMIT, so concurrent runners always receive
+    distinct run numbers.
+
+    Args:
+        session: Snowflake session
+        database_names: Iterable of database (application) names
+
+    Returns:
+        dict: database name -> RunMetadata, all sharing one user ID and execution date
+    """
+    database_names = sorted(set(database_names))
+    if not database_names:
+        return {}
+    source_rows = ", ".join(f"('{name}')" for name in database_names)
+    name_list = ", ".join(f"'{name}'" for name in database_names)
+
+    allocation_block = f"""
+    EXECUTE IMMEDIATE $$
+    BEGIN
+        BEGIN TRANSACTION;
+        MERGE INTO {RUN_ID_TRACKER_TABLE} AS T
+        USING (SELECT COLUMN1 AS DATABASE_NAME FROM VALUES {source_rows}) AS S
+        ON T.DATABASE_NAME = S.DATABASE_NAME
+        WHEN MATCHED THEN UPDATE SET RUN_NUMBER = T.RUN_NUMBER + 1
+        WHEN NOT MATCHED THEN INSERT (DATABASE_NAME, RUN_NUMBER) VALUES (S.DATABASE_NAME, 1);
+        LET allocated RESULTSET := (
+            SELECT CURRENT_USER() AS USER_ID, CURRENT_TIMESTAMP() AS EXECUTION_DATE, DATABASE_NAME, RUN_NUMBER
+            FROM {RUN_ID_TRACKER_TABLE}
+            WHERE DATABASE_NAME IN ({name_list})
+        );
+        COMMIT;
+        RETURN TABLE(allocated);
+    END;
+    $$
+    """
+    rows = session.sql(allocation_block).collect()
+
+    run_metadata_map = {}
+    for row in rows:
+        database_name = row['DATABASE_NAME']
+        run_metadata_map[database_name] = RunMetadata(
+            user_id=row['USER_ID'],
+            execution_date=row['EXECUTION_DATE'],
+            run_id=f"{database_name}_{row['RUN_NUMBER']}",
+            database_name=database_name
         )
-        test_cases.append(test_case)
-    
-    return test_cases
+    return run_metadata_map
 
 def get_run_metadata(session, database_name):
     """Get user, execution timestamp, and generate RUN_ID with per-database counter."""
-    # Retrieve user ID and execution timestamp
-    user_id = session.sql("SELECT CURRENT_USER()").collect()[0][0]
-    execution_date = session.sql("SELECT CURRENT_TIMESTAMP()").collect()[0][0]
-    # Ensure an entry exists for the database (insert if not exists)
-    session.sql(f"""
-        INSERT INTO {RUN_ID_TRACKER_TABLE} (DATABASE_NAME, RUN_NUMBER)
-        SELECT '{database_name}', 0
-        WHERE NOT EXISTS (SELECT 1 FROM {RUN_ID_TRACKER_TABLE} WHERE DATABASE_NAME = '{database_name}')
-    """).collect()
-    
-    # Increment the counter
-    session.sql(f"""
-        UPDATE {RUN_ID_TRACKER_TABLE}
-        SET RUN_NUMBER = RUN_NUMBER + 1
-        WHERE DATABASE_NAME = '{database_name}';
-    """).collect()
-
-    # Fetch the updated run number
-    run_count = session.sql(f"""
-        SELECT RUN_NUMBER FROM {RUN_ID_TRACKER_TABLE} WHERE DATABASE_NAME = '{database_name}';
-    """).collect()[0][0]
-    
-    # Construct RUN_ID
-    run_id = f"{database_name}_{run_count}"
-    
-    return RunMetadata(
-        user_id=user_id,
-        execution_date=execution_date,
-        run_id=run_id,
-        database_name=database_name
-    )
\ No newline at end of file
+    return allocate_run_metadata(session, [database_name])[database_name]
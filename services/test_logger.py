@@ -1,9 +1,55 @@
 """Functions for logging test results."""
 import io
+import json
+import threading
+import time
 from datetime import datetime
-from config.config import TEST_LOGS_TABLE, TEST_CASE_RESULTS_STAGE, TEST_SCRIPTS_TABLE, ts_id_error
-from utils.pdf_generator import create_pdf_report
+from config.config import TEST_LOGS_TABLE, TEST_CASE_RESULTS_STAGE, TEST_SCRIPTS_TABLE, ts_id_error, \
+    LOG_FLUSH_ROWS, LOG_FLUSH_SECONDS, REPORT_MODE, REPORT_MODES
+from services.report_renderer import get_report_renderer
 from utils.db_utils import get_object_details
+from utils.timing import PHASES, timed_phase
+from utils.profiling import trace_span
+
+# Which results get a PDF report: "none", "failures" (Fail and Error) or "all"
+_report_mode = REPORT_MODE
+
+def set_report_mode(mode):
+    """Set the report mode for the rest of the run."""
+    global _report_mode
+    if mode not in REPORT_MODES:
+        raise ValueError(f"Unsupported report mode: {mode}. Expected one of {', '.join(REPORT_MODES)}")
+    _report_mode = mode
+
+def get_report_mode():
+    """Return the active report mode."""
+    return _report_mode
+
+# Run-wide checkpoint journal (services/checkpoint); None means logged results are not journaled
+_checkpoint_journal = None
+
+def set_checkpoint_journal(journal):
+    """Journal every logged result for the rest of the run (None turns journaling off)."""
+    global _checkpoint_journal
+    _checkpoint_journal = journal
+
+def should_generate_report(result):
+    """Check whether the active report mode asks for a PDF report of this result."""
+    if _report_mode == "none":
+        return False
+    if _report_mode == "failures":
+        return result.status in ("Fail", "Error")
+    return True
+
+def build_result_file_path(ts_id):
+    """Build the stage path of a test's PDF report: {DB}/{SCH}/{TAB}/{OP} layout with a readable timestamp."""
+    # Format the timestamp
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H:%M:%S")
+    
+    # Get database, schema, and table names from ts_id
+    DB, SCH, TAB, OP = get_object_details(ts_id)
+    
+    return f"{TEST_CASE_RESULTS_STAGE}/{DB}/{SCH}/{TAB}/{OP}/TS_{ts_id}_Test_Results_{timestamp}.pdf"
 
 def save_test_result_as_pdf(session, result, metadata):
     """
@@ -15,27 +61,30 @@ def save_test_result_as_pdf(session, result, metadata):
         metadata: RunMetadata object
         
     Returns:
-        str: Path to the saved PDF file
+        str: Path to the saved PDF file (rendered in the background when a ReportRenderer is running)
     """
     try:
-        # Generate PDF content
-        pdf_content = create_pdf_report(result, metadata)
+        # Define the file path
+        pdf_file_path = build_result_file_path(result.ts_id)
+        
+        # Hand the report to the background renderer when one is running
+        report_renderer = get_report_renderer()
+        if report_renderer is not None:
+            report_renderer.submit(result, metadata, pdf_file_path)
+            return pdf_file_path
+        
+        # Generate PDF content (ReportLab is only imported when a report is actually rendered)
+        with timed_phase(result.phase_timings, "render"):
+            from utils.pdf_generator import create_pdf_report
+            pdf_content = create_pdf_report(result, metadata)
         
         # Create buffer from PDF bytes
         pdf_buffer = io.BytesIO(pdf_content)
         pdf_buffer.seek(0)
         
-        # Format the timestamp
-        timestamp = datetime.now().strftime("%Y-%m-%d_%H:%M:%S")
-        
-        # Get database, schema, and table names from ts_id
-        DB, SCH, TAB, OP = get_object_details(result.ts_id)
-        
-        # Define the file path
-        pdf_file_path = f"{TEST_CASE_RESULTS_STAGE}/{DB}/{SCH}/{TAB}/{OP}/TS_{result.ts_id}_Test_Results_{timestamp}.pdf"
-        
         # Upload to Snowflake stage
-        session.file.put_stream(pdf_buffer, pdf_file_path, auto_compress=False)
+        with timed_phase(result.phase_timings, "upload"):
+            session.file.put_stream(pdf_buffer, pdf_file_path, auto_compress=False)
         
         # print(f"PDF result saved at: {pdf_file_path}")
         return pdf_file_path
@@ -45,42 +94,196 @@ def save_test_result_as_pdf(session, result, metadata):
         print(f"Error saving PDF result: {error_msg}")
         return "N/A"
 
+LOG_COLUMNS = """(USER_ID, TS_ID, DB_STRUCTURE, VALIDATION_TYPE, EXECUTED_QUERY, SOURCE_COUNT, TARGET_COUNT, STATUS, EXPECTED_RESULT,
+        ACTUAL_RESULT, MINUS_QUERY_FILE_PATH, EXECUTION_TIME, EXECUTION_DATE, ERROR_DESCRIPTION, RUN_ID, 
+        RESULT_FILE_PATH, SOURCE_ONLY_COUNT, TARGET_ONLY_COUNT, COUNT_METHOD, SOURCE_QUERY_TIME, TARGET_QUERY_TIME,
+        REFRESH_CHECK_TIME, DIFF_QUERY_TIME, EXPORT_TIME, RENDER_TIME, UPLOAD_TIME, LOG_TIME, QUERY_IDS,
+        COLUMN_DIFFERENCES)"""
+
+def build_phase_values(result):
+    """Format the <PHASE>_TIME values of a TEST_LOGS row; phases a test did not go through are NULL."""
+    timings = result.phase_timings
+    return ", ".join(f"{round(timings[phase], 3)}" if phase in timings else "NULL" for phase in PHASES)
+
+def build_column_differences_value(result):
+    """Format the COLUMN_DIFFERENCES value of a TEST_LOGS row: a JSON list, or NULL when none were computed."""
+    if not result.column_differences:
+        return "NULL"
+    return "'{}'".format(json.dumps([list(difference) for difference in result.column_differences],
+                                    default=str).replace("\\", "\\\\").replace("'", "''"))
+
+def build_log_values(result, metadata):
+    """Build the VALUES tuple of a TEST_LOGS row for one test result."""
+    return f"""
+        ('{metadata.user_id}', '{result.ts_id}', '{result.db_structure}', '{result.validation_type}', 
+        '{result.executed_query.replace("'", "''")}', 
+        {result.source_count if result.source_count != "NULL" else "NULL"}, 
+        {result.target_count if result.target_count != "NULL" else "NULL"}, 
+        '{result.status}','{result.expected_result}', '{result.actual_result}', '{result.minus_query_file_path}', 
+        {result.execution_time}, '{metadata.execution_date}', '{result.error_description}', '{metadata.run_id}', 
+        '{result.result_file_path}', 
+        {result.source_only_count if result.source_only_count != "NULL" else "NULL"}, 
+        {result.target_only_count if result.target_only_count != "NULL" else "NULL"}, 
+        '{result.count_method}', {build_phase_values(result)}, '{",".join(result.query_ids)}',
+        {build_column_differences_value(result)})"""
+
+def insert_log_rows(session, rows):
+    """Insert (result, metadata) pairs into TEST_LOGS with a single multi-row INSERT."""
+    insert_log_values(session, [build_log_values(result, metadata) for result, metadata in rows])
+
+def insert_log_values(session, values_list):
+    """Insert prebuilt VALUES tuples (see build_log_values) into TEST_LOGS with a single multi-row INSERT."""
+    if not values_list:
+        return
+    values = ",".join(values_list)
+    log_insert_query = f"""
+        INSERT INTO {TEST_LOGS_TABLE} 
+        {LOG_COLUMNS}
+        VALUES {values}
+    """
+    # print(f"Inserting Log: {log_insert_query}")
+    session.sql(log_insert_query).collect()
+
+class TestLogBuffer:
+    """
+    Thread-safe buffer of TEST_LOGS rows flushed in bulk.
+
+    Rows are written with one multi-row INSERT once `max_rows` are pending or
+    the oldest pending row is older than `max_seconds`. The caller must call
+    `flush` at the end of the run (main.py does so from its finally block).
+
+    Passed test cases are deactivated by the same flush with one set-based
+    UPDATE, and only after their log rows were inserted, so a partial run never
+    leaves a test deactivated without its TEST_LOGS entry.
+
+    With `auto_flush=False` rows are only held: the owner takes them with
+    `drain` and writes them itself (distributed runners write them together
+    with the completion of their TEST_QUEUE claim).
+    """
+
+    def __init__(self, max_rows=LOG_FLUSH_ROWS, max_seconds=LOG_FLUSH_SECONDS, auto_flush=True):
+        self.max_rows = max(1, max_rows)
+        self.max_seconds = max_seconds
+        self.auto_flush = auto_flush
+        self._rows = []
+        self._first_added = None
+        self._lock = threading.Lock()
+
+    def add(self, session, result, metadata):
+        """Buffer a result row, flushing on the given session when a threshold is reached."""
+        with self._lock:
+            if not self._rows:
+                self._first_added = time.monotonic()
+            self._rows.append((result, metadata))
+            due = self.auto_flush and (len(self._rows) >= self.max_rows
+                                       or time.monotonic() - self._first_added >= self.max_seconds)
+        if due:
+            try:
+                self.flush(session)
+            except Exception as e:
+                # Rows stay buffered and are retried by the next flush
+                print(f"Error flushing test logs: {e}")
+
+    def flush(self, session):
+        """Write every pending row to TEST_LOGS. Rows are re-queued if the insert fails."""
+        with self._lock:
+            rows, self._rows = self._rows, []
+            self._first_added = None
+        for start in range(0, len(rows), self.max_rows):
+            chunk = rows[start:start + self.max_rows]
+            try:
+                with trace_span("flush TEST_LOGS", "logging", rows=len(chunk)):
+                    insert_log_rows(session, chunk)
+            except Exception:
+                with self._lock:
+                    self._rows = rows[start:] + self._rows
+                    self._first_added = self._first_added or time.monotonic()
+                raise
+            # Logs are persisted; a failure here only leaves the tests active, so they simply run again
+            deactivate_test_cases(session, [result.ts_id for result, _ in chunk if result.status == "Pass"])
+
+    def drain(self):
+        """Remove and return every pending (result, metadata) row without writing it."""
+        with self._lock:
+            rows, self._rows = self._rows, []
+            self._first_added = None
+        return rows
+
+    def pending(self):
+        """Return the number of rows waiting to be flushed."""
+        with self._lock:
+            return len(self._rows)
+
+# Run-wide buffer; None means every result is inserted immediately
+_log_buffer = None
+
+def enable_log_buffer(max_rows=LOG_FLUSH_ROWS, max_seconds=LOG_FLUSH_SECONDS, auto_flush=True):
+    """Route log_test_result through a bulk-flushed buffer for the rest of the run."""
+    global _log_buffer
+    _log_buffer = TestLogBuffer(max_rows, max_seconds, auto_flush)
+    return _log_buffer
+
+def get_log_buffer():
+    """Return the active TestLogBuffer, or None when buffering is disabled."""
+    return _log_buffer
+
+def flush_log_buffer(session):
+    """Flush any buffered TEST_LOGS rows. Safe to call when buffering is disabled."""
+    if _log_buffer is not None:
+        _log_buffer.flush(session)
+
 def log_test_result(session, result, metadata):
-    """Log test execution results to the database."""
+    """
+    Log test execution results to the database (buffered when enable_log_buffer was called).
+
+    LOG_TIME is the time spent queuing the row. A row cannot carry the duration
+    of its own INSERT, so it stays NULL for unbuffered inserts and for the row
+    whose add triggers a flush.
+
+    With a checkpoint journal set, the result is journaled once it is logged.
+    """
     
     # Save results as PDF and get the file path
     if result.status == 'Error' and result.error_description == f"{ts_id_error}":
         # print("Invalid TS_ID, So no results file will get generated")
         result.result_file_path = 'N/A'
+    elif not should_generate_report(result):
+        # Skipped by the report mode; regenerate later from TEST_LOGS if needed
+        result.result_file_path = 'N/A'
     else:
         result.result_file_path = save_test_result_as_pdf(session, result, metadata)
     
     # Insert log entry with the PDF file path
-    log_insert_query = f"""
-        INSERT INTO {TEST_LOGS_TABLE} 
-        (USER_ID, TS_ID, DB_STRUCTURE, VALIDATION_TYPE, EXECUTED_QUERY, SOURCE_COUNT, TARGET_COUNT, STATUS, EXPECTED_RESULT,
-        ACTUAL_RESULT, MINUS_QUERY_FILE_PATH, EXECUTION_TIME, EXECUTION_DATE, ERROR_DESCRIPTION, RUN_ID, 
-        RESULT_FILE_PATH)
-        VALUES 
-        ('{metadata.user_id}', '{result.ts_id}', '{result.db_structure}', '{result.validation_type}', 
-        '{result.executed_query.replace("'", "''")}', 
-        {result.source_count if result.source_count != "NULL" else "NULL"}, 
-        {result.target_count if result.target_count != "NULL" else "NULL"}, 
-        '{result.status}','{result.expected_result}', '{result.actual_result}', '{result.minus_query_file_path}', 
-        {result.execution_time}, '{metadata.execution_date}', '{result.error_description}', '{metadata.run_id}', 
-        '{result.result_file_path}')
+    with timed_phase(result.phase_timings, "log"):
+        if _log_buffer is not None:
+            _log_buffer.add(session, result, metadata)
+        else:
+            insert_log_rows(session, [(result, metadata)])
+    if _checkpoint_journal is not None:
+        _checkpoint_journal.record(result, metadata, build_log_values(result, metadata))
+
+def deactivate_test_cases(session, ts_ids):
+    """Set ACTIVE_FLAG = 'N' for all given TS_IDs with one set-based UPDATE."""
+    ts_ids = sorted(set(ts_ids))
+    if not ts_ids:
+        return
+    id_list = ", ".join(f"'{ts_id}'" for ts_id in ts_ids)
+    update_query = f"""
+        UPDATE {TEST_SCRIPTS_TABLE}
+        SET ACTIVE_FLAG = 'N'
+        WHERE TS_ID IN ({id_list})
     """
-    
-    # print(f"Inserting Log: {log_insert_query}")
-    session.sql(log_insert_query).collect()
+    # print(f"Updating ACTIVE_FLAG: {update_query}")
+    session.sql(update_query).collect()
 
 def update_test_status(session, ts_id, status):
-    """Update test case status if test passes."""
+    """
+    Update test case status if test passes.
+
+    When the log buffer is enabled this is a no-op: passed tests are
+    deactivated in bulk by TestLogBuffer.flush once their logs are written.
+    """
+    if _log_buffer is not None:
+        return
     if status == "Pass":
-        update_query = f"""
-            UPDATE {TEST_SCRIPTS_TABLE}
-            SET ACTIVE_FLAG = 'N'
-            WHERE TS_ID = '{ts_id}'
-        """
-        # print(f"Updating ACTIVE_FLAG: {update_query}")
-        session.sql(update_query).collect()
\ No newline at end of file
+        deactivate_test_cases(session, [ts_id])
@@ -0,0 +1,254 @@
+"""TEST_QUEUE operations for distributed runs: publish, claim with leases, renew and complete."""
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime
+
+from config.config import TEST_QUEUE_TABLE, TEST_LOGS_TABLE, TEST_SCRIPTS_TABLE, QUEUE_LEASE_SECONDS, \
+    QUEUE_MAX_ATTEMPTS, QUEUE_PUBLISH_BATCH_SIZE
+from models.data_classes import RunMetadata
+from services.test_logger import LOG_COLUMNS, build_log_values
+
+# A queued test can be claimed while pending, or when the runner holding it stopped renewing its lease
+CLAIMABLE = f"""(STATUS = 'PENDING' OR (STATUS = 'CLAIMED' AND LEASE_EXPIRES_AT < CURRENT_TIMESTAMP()))
+        AND ATTEMPTS < {QUEUE_MAX_ATTEMPTS}"""
+
+def new_queue_id():
+    """Build a readable, unique ID for a published run."""
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+def new_worker_id():
+    """Identify this runner in TEST_QUEUE.WORKER_ID as host:pid."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def publish_test_cases(session, queue_id, schedule, run_metadata_map, batch_size=QUEUE_PUBLISH_BATCH_SIZE):
+    """
+    Publish the test cases of a run into TEST_QUEUE.
+
+    Every row carries the RunMetadata of its database, so each runner logs
+    into the RUN_IDs allocated by the publishing run, and its position in
+    `schedule` as PRIORITY, so runners claim tests in the scheduled order.
+
+    Args:
+        session: Snowflake session
+        queue_id: ID of the distributed run (see new_queue_id)
+        schedule: list of (database name, TestCase) pairs in submission order
+        run_metadata_map: dict of database name -> RunMetadata object
+        batch_size: Rows per multi-row INSERT
+
+    Returns:
+        int: Number of published test cases
+    """
+    rows = [
+        f"('{queue_id}', '{test_case.ts_id}', '{db_name}', '{run_metadata_map[db_name].run_id}', "
+        f"'{run_metadata_map[db_name].user_id}', '{run_metadata_map[db_name].execution_date}', {priority}, "
+        f"'PENDING', 0, CURRENT_TIMESTAMP())"
+        for priority, (db_name, test_case) in enumerate(schedule)
+    ]
+    for start in range(0, len(rows), batch_size):
+        session.sql(f"""
+            INSERT INTO {TEST_QUEUE_TABLE}
+            (QUEUE_ID, TS_ID, DATABASE_NAME, RUN_ID, USER_ID, EXECUTION_DATE, PRIORITY, STATUS, ATTEMPTS, UPDATED_AT)
+            VALUES {",".join(rows[start:start + batch_size])}
+        """).collect()
+    return len(rows)
+
+def load_queue_manifest(session, queue_id):
+    """
+    Return the RUN_IDs and TS_IDs published under `queue_id`.
+
+    Returns:
+        tuple: (dict of database name -> RUN_ID, list of TS_IDs); both empty for an unknown queue ID
+    """
+    rows = session.sql(f"""
+        SELECT TS_ID, DATABASE_NAME, RUN_ID FROM {TEST_QUEUE_TABLE} WHERE QUEUE_ID = '{queue_id}'
+    """).collect()
+    return {row['DATABASE_NAME']: row['RUN_ID'] for row in rows}, [row['TS_ID'] for row in rows]
+
+def claim_batch(session, queue_id, worker_id, batch_size, lease_seconds=QUEUE_LEASE_SECONDS):
+    """
+    Claim up to `batch_size` queued test cases for this runner, in PRIORITY order.
+
+    The claim is one Snowflake Scripting block: the UPDATE stamps a fresh
+    CLAIM_TOKEN and lease on the claimable rows, and the claimed rows are read
+    back by that token inside the same transaction. UPDATE locks TEST_QUEUE
+    until COMMIT, so concurrent runners never claim the same row twice. Rows
+    whose lease expired are reclaimed here too, under a new token, which
+    fences out the runner that lost them (see complete_batch).
+
+    Returns:
+        tuple: (claim token, list of (database name, TS_ID) in PRIORITY order, dict of database name -> RunMetadata)
+    """
+    claim_token = uuid.uuid4().hex
+    claim_block = f"""
+    EXECUTE IMMEDIATE $$
+    BEGIN
+        BEGIN TRANSACTION;
+        UPDATE {TEST_QUEUE_TABLE}
+        SET STATUS = 'CLAIMED', WORKER_ID = '{worker_id}', CLAIM_TOKEN = '{claim_token}',
+            LEASE_EXPIRES_AT = DATEADD(SECOND, {int(lease_seconds)}, CURRENT_TIMESTAMP()),
+            ATTEMPTS = ATTEMPTS + 1, UPDATED_AT = CURRENT_TIMESTAMP()
+        WHERE QUEUE_ID = '{queue_id}'
+        AND {CLAIMABLE}
+        AND TS_ID IN (
+            SELECT TS_ID FROM {TEST_QUEUE_TABLE}
+            WHERE QUEUE_ID = '{queue_id}'
+            AND {CLAIMABLE}
+            ORDER BY PRIORITY
+            LIMIT {int(batch_size)}
+        );
+        LET claimed RESULTSET := (
+            SELECT TS_ID, DATABASE_NAME, RUN_ID, USER_ID, EXECUTION_DATE, PRIORITY
+            FROM {TEST_QUEUE_TABLE}
+            WHERE QUEUE_ID = '{queue_id}' AND CLAIM_TOKEN = '{claim_token}'
+            ORDER BY PRIORITY
+        );
+        COMMIT;
+        RETURN TABLE(claimed);
+    END;
+    $$
+    """
+    rows = session.sql(claim_block).collect()
+
+    claimed = []
+    run_metadata_map = {}
+    for row in rows:
+        database_name = row['DATABASE_NAME']
+        claimed.append((database_name, row['TS_ID']))
+        run_metadata_map.setdefault(database_name, RunMetadata(
+            user_id=row['USER_ID'],
+            execution_date=row['EXECUTION_DATE'],
+            run_id=row['RUN_ID'],
+            database_name=database_name
+        ))
+    return claim_token, claimed, run_metadata_map
+
+def renew_lease(session, queue_id, claim_token, lease_seconds=QUEUE_LEASE_SECONDS):
+    """
+    Extend the lease of a claim.
+
+    Returns:
+        int: Number of rows still held under `claim_token` (0 once the claim was reclaimed or completed)
+    """
+    rows = session.sql(f"""
+        UPDATE {TEST_QUEUE_TABLE}
+        SET LEASE_EXPIRES_AT = DATEADD(SECOND, {int(lease_seconds)}, CURRENT_TIMESTAMP()),
+            UPDATED_AT = CURRENT_TIMESTAMP()
+        WHERE QUEUE_ID = '{queue_id}' AND CLAIM_TOKEN = '{claim_token}' AND STATUS = 'CLAIMED'
+    """).collect()
+    return rows[0][0] if rows else 0
+
+def complete_batch(session, queue_id, claim_token, log_rows):
+    """
+    Write the results of a claim and mark it done, only if the claim is still held.
+
+    In one transaction the TEST_LOGS rows are inserted, passed tests are
+    deactivated and the queue rows are set to DONE. Every statement is
+    restricted to rows still claimed under `claim_token`: if the lease expired
+    and another runner reclaimed a test, this runner's result for it is
+    dropped, so each queued test gets exactly one TEST_LOGS row per run.
+
+    Args:
+        session: Snowflake session
+        queue_id: ID of the distributed run
+        claim_token: Token returned by claim_batch
+        log_rows: (TestResult, RunMetadata) pairs of the claimed tests
+
+    Returns:
+        int: Number of queue rows completed; fewer than claimed means some results were dropped
+    """
+    held = f"""SELECT TS_ID FROM {TEST_QUEUE_TABLE}
+            WHERE QUEUE_ID = '{queue_id}' AND CLAIM_TOKEN = '{claim_token}' AND STATUS = 'CLAIMED'"""
+    statements = []
+    if log_rows:
+        values = ",".join(build_log_values(result, metadata) for result, metadata in log_rows)
+        statements.append(f"""
+        INSERT INTO {TEST_LOGS_TABLE} {LOG_COLUMNS}
+        SELECT * FROM (VALUES {values}) AS V{LOG_COLUMNS}
+        WHERE V.TS_ID IN ({held});""")
+    passed = sorted({result.ts_id for result, _ in log_rows if result.status == "Pass"})
+    if passed:
+        id_list = ", ".join(f"'{ts_id}'" for ts_id in passed)
+        statements.append(f"""
+        UPDATE {TEST_SCRIPTS_TABLE}
+        SET ACTIVE_FLAG = 'N'
+        WHERE TS_ID IN ({id_list}) AND TS_ID IN ({held});""")
+
+    completion_block = f"""
+    EXECUTE IMMEDIATE $$
+    BEGIN
+        BEGIN TRANSACTION;{"".join(statements)}
+        UPDATE {TEST_QUEUE_TABLE}
+        SET STATUS = 'DONE', LEASE_EXPIRES_AT = NULL, UPDATED_AT = CURRENT_TIMESTAMP()
+        WHERE QUEUE_ID = '{queue_id}' AND CLAIM_TOKEN = '{claim_token}' AND STATUS = 'CLAIMED';
+        LET completed INTEGER := SQLROWCOUNT;
+        COMMIT;
+        RETURN completed;
+    END;
+    $$
+    """
+    return int(session.sql(completion_block).collect()[0][0])
+
+def queue_progress(session, queue_id):
+    """
+    Summarize the state of a distributed run.
+
+    Returns:
+        dict: counts of 'claimable', 'in_progress' (claimed under a live lease), 'done'
+              and 'abandoned' (out of attempts) test cases
+    """
+    row = session.sql(f"""
+        SELECT COUNT_IF({CLAIMABLE}) AS CLAIMABLE,
+               COUNT_IF(STATUS = 'CLAIMED' AND LEASE_EXPIRES_AT >= CURRENT_TIMESTAMP()) AS IN_PROGRESS,
+               COUNT_IF(STATUS = 'DONE') AS DONE,
+               COUNT_IF(STATUS <> 'DONE' AND ATTEMPTS >= {QUEUE_MAX_ATTEMPTS}
+                        AND NOT (STATUS = 'CLAIMED' AND LEASE_EXPIRES_AT >= CURRENT_TIMESTAMP())) AS ABANDONED
+        FROM {TEST_QUEUE_TABLE}
+        WHERE QUEUE_ID = '{queue_id}'
+    """).collect()[0]
+    return {key.lower(): int(row[key] or 0) for key in ("CLAIMABLE", "IN_PROGRESS", "DONE", "ABANDONED")}
+
+class LeaseKeeper:
+    """
+    Background thread renewing the lease of the claim a runner is working on.
+
+    The lease is renewed every third of its length, so a live runner keeps its
+    claim however long its tests take, while the claim of a crashed runner
+    expires after at most `lease_seconds` and is reclaimed by another runner.
+    """
+
+    def __init__(self, session, queue_id, lease_seconds=QUEUE_LEASE_SECONDS):
+        self.session = session
+        self.queue_id = queue_id
+        self.lease_seconds = lease_seconds
+        self._claim_token = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="lease-keeper", daemon=True)
+        self._thread.start()
+
+    def hold(self, claim_token):
+        """Renew `claim_token` from now on (None stops renewing)."""
+        with self._lock:
+            self._claim_token = claim_token
+
+    def _run(self):
+        while not self._stop.wait(max(1, self.lease_seconds / 3)):
+            with self._lock:
+                claim_token = self._claim_token
+            if claim_token is None:
+                continue
+            try:
+                if not renew_lease(self.session, self.queue_id, claim_token, self.lease_seconds):
+                    print(f"⚠️ Lease of claim {claim_token} was lost; its results will be discarded.")
+                    with self._lock:
+                        if self._claim_token == claim_token:
+                            self._claim_token = None
+            except Exception as e:
+                # Retried on the next tick; the lease only expires if renewals keep failing
+                print(f"Error renewing lease: {e}")
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
@@ -1,10 +1,18 @@
 """Database utility functions for ETL testing."""
 import json
 import os
-from snowflake.snowpark import Session
+import queue
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from config.config import QUERY_CACHE_SIZE
 
 def create_session():
     """Create a Snowflake session from connection.json."""
+    # Snowpark (with the connector and pandas) takes most of a second to import, so only pay for it when connecting
+    from snowflake.snowpark import Session
+
     # Get the directory of the current script
     current_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     
@@ -18,11 +26,171 @@ def create_session():
     # Create and return session
     return Session.builder.configs(connection_params).create()
 
+class SessionPool:
+    """
+    Bounded pool of Snowflake sessions shared by parallel test workers.
+
+    Sessions are created lazily up to `size`; a caller borrows one with
+    `with pool.session() as session:` and it is returned to the pool on exit.
+    An already open session (e.g. the one used to fetch test cases) can be
+    handed in as `seed_session` so it is reused as the first pool member.
+    """
+
+    def __init__(self, size, seed_session=None):
+        self.size = max(1, int(size))
+        self._idle = queue.Queue()
+        self._sessions = []
+        self._lock = threading.Lock()
+        if seed_session is not None:
+            self._sessions.append(seed_session)
+            self._idle.put(seed_session)
+
+    def _acquire(self):
+        """Return an idle session, creating a new one while below the pool size."""
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._sessions) < self.size:
+                session = create_session()
+                self._sessions.append(session)
+                return session
+        return self._idle.get()
+
+    @contextmanager
+    def session(self):
+        """Borrow a session from the pool for the duration of the with-block."""
+        session = self._acquire()
+        try:
+            yield session
+        finally:
+            self._idle.put(session)
+
+    def close(self, keep=None):
+        """Close every pooled session except `keep` (typically the seed session)."""
+        with self._lock:
+            for session in self._sessions:
+                if session is keep:
+                    continue
+                try:
+                    session.close()
+                except Exception:
+                    pass
+            self._sessions = [s for s in self._sessions if s is keep]
+
+# Quoted literals and identifiers (kept as written), or a run of whitespace and comments (collapsed to one space)
+SQL_NORMALIZE_PATTERN = re.compile(
+    r"""('(?:[^'\\]|\\.|'')*'|"(?:[^"]|"")*"|\$\$.*?\$\$)|((?:\s|--[^\n]*|//[^\n]*|/\*.*?\*/)+)""",
+    re.DOTALL
+)
+
+def normalize_sql(query):
+    """
+    Normalize SQL text for cache keys: collapse whitespace and comments and drop trailing semicolons.
+
+    Quoted string literals and identifiers are left untouched, so
+    'A  B' and 'A B' remain different queries.
+    """
+    normalized = SQL_NORMALIZE_PATTERN.sub(lambda match: match.group(1) or " ", query)
+    return normalized.strip().rstrip(";").strip()
+
+class QueryResultCache:
+    """
+    Run-scoped, size-bounded LRU cache of scalar query results keyed by normalized SQL.
+
+    Concurrent callers asking for the same query wait for the first execution
+    instead of running it again, so each distinct query runs once per run.
+    Failed queries are not cached.
+    """
+
+    def __init__(self, max_entries=QUERY_CACHE_SIZE):
+        self.max_entries = max(1, max_entries)
+        self.hits = 0
+        self.misses = 0
+        self._results = OrderedDict()
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def get_or_execute(self, session, query):
+        """Return the cached result of `query`, executing it on `session` on a miss."""
+        key = normalize_sql(query)
+        while True:
+            with self._lock:
+                if key in self._results:
+                    self._results.move_to_end(key)
+                    self.hits += 1
+                    return self._results[key]
+                pending = self._in_flight.get(key)
+                if pending is None:
+                    pending = self._in_flight[key] = threading.Event()
+                    self.misses += 1
+                    break
+            # Another worker is running the same query; wait and re-check the cache
+            pending.wait()
+
+        try:
+            value = session.sql(query).collect()[0][0]
+            with self._lock:
+                self._results[key] = value
+                self._results.move_to_end(key)
+                while len(self._results) > self.max_entries:
+                    self._results.popitem(last=False)
+            return value
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            pending.set()
+
+    def invalidate(self, query=None):
+        """Drop one cached query, or every cached result when `query` is None."""
+        with self._lock:
+            if query is None:
+                self._results.clear()
+            else:
+                self._results.pop(normalize_sql(query), None)
+
+    def stats(self):
+        """Return (hits, misses) counters."""
+        with self._lock:
+            return self.hits, self.misses
+
+# Run-wide cache; None means every execute_query call hits Snowflake
+_query_cache = None
+
+def enable_query_cache(max_entries=QUERY_CACHE_SIZE):
+    """Cache execute_query results for the rest of the run."""
+    global _query_cache
+    _query_cache = QueryResultCache(max_entries)
+    return _query_cache
+
+def get_query_cache():
+    """Return the active QueryResultCache, or None when caching is disabled."""
+    return _query_cache
+
 def execute_query(session, query, description):
-    """Execute a SQL query with error handling and logging."""
+    """Execute a SQL query with error handling and logging (served from the run cache when enabled)."""
     # print(f"Executing {description}: {query}")
+    if _query_cache is not None:
+        return _query_cache.get_or_execute(session, query)
     return session.sql(query).collect()[0][0]
 
+@contextmanager
+def capture_query_ids(session):
+    """
+    Collect the IDs of the queries issued on `session` inside the with-block.
+
+    Uses Snowpark's query history listener, so it must only wrap work done on
+    a session the caller has to itself (e.g. one borrowed from a SessionPool).
+    Results served from the run cache issue no query and add no ID.
+    """
+    query_ids = []
+    with session.query_history() as history:
+        try:
+            yield query_ids
+        finally:
+            query_ids.extend(record.query_id for record in history.queries)
+
 def get_object_details(ts_id):
     """Extract DB name, Schema name, Table name"""
     l = ts_id.split('-')
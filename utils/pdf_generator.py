@@ -1,6 +1,7 @@
 """PDF report generation for ETL test results."""
 from datetime import datetime
 import io
+from xml.sax.saxutils import escape
 from reportlab.lib.pagesizes import letter
 from reportlab.lib import colors
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
@@ -9,26 +10,31 @@ from reportlab.lib.units import inch
 
 from utils.db_utils import get_object_details
 
-def create_pdf_report(result, metadata):
-    """
-    Create a PDF report from test results data.
-    
-    Args:
-        result (TestResult): Test result object
-        metadata (RunMetadata): Run metadata object
-        
-    Returns:
-        bytes: PDF file content as bytes
-    """
-    # Create an in-memory buffer for the PDF
-    buffer = io.BytesIO()
-    
-    # Create the PDF document using ReportLab
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
+# Paragraph and table styles are built once per process (see get_report_styles)
+_report_styles = None
+
+def _label_table_style(valign_top=False):
+    """Table style shared by the two-column label/value tables."""
+    commands = [
+        ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
+        ('TEXTCOLOR', (0, 0), (0, -1), colors.black),
+        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (-1, -1), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ]
+    if valign_top:
+        commands.append(('VALIGN', (0, 0), (-1, -1), 'TOP'))  # Align all cells to top for consistency
+    return TableStyle(commands)
+
+def _build_report_styles():
+    """Create every ParagraphStyle and TableStyle used by create_pdf_report."""
     styles = getSampleStyleSheet()
+    report_styles = {'normal': styles['Normal']}
     
     # Create custom styles
-    title_style = ParagraphStyle(
+    report_styles['title'] = ParagraphStyle(
         'Title',
         parent=styles['Heading1'],
         fontSize=16,
@@ -36,7 +42,7 @@ def create_pdf_report(result, metadata):
         spaceAfter=0.1*inch
     )
     
-    subtitle_style = ParagraphStyle(
+    report_styles['subtitle'] = ParagraphStyle(
         'Subtitle',
         parent=styles['Heading3'],
         fontSize=12,
@@ -44,15 +50,14 @@ def create_pdf_report(result, metadata):
         spaceAfter=0.3*inch
     )
     
-    heading_style = ParagraphStyle(
+    report_styles['heading'] = ParagraphStyle(
         'Heading',
         parent=styles['Heading2'],
         fontSize=14,
         spaceAfter=0.2*inch
     )
     
-    normal_style = styles['Normal']
-    code_style = ParagraphStyle(
+    report_styles['code'] = ParagraphStyle(
         'Code',
         parent=styles['Code'],
         fontName='Courier',
@@ -61,7 +66,7 @@ def create_pdf_report(result, metadata):
     )
     
     # Create watermark style for "Generated" timestamp
-    watermark_style = ParagraphStyle(
+    report_styles['watermark'] = ParagraphStyle(
         'Watermark',
         parent=styles['Normal'],
         fontName='Helvetica-Oblique',
@@ -70,6 +75,91 @@ def create_pdf_report(result, metadata):
         alignment=2  # Right alignment
     )
     
+    # Paragraph style for potential long text (error description, file path)
+    report_styles['long_text'] = ParagraphStyle(
+        'LongText',
+        parent=styles['Normal'],
+        fontSize=10,
+        wordWrap='CJK',
+        leading=12
+    )
+    
+    report_styles['cell'] = ParagraphStyle(
+        'Cell',
+        parent=styles['Normal'],
+        fontSize=9,
+        wordWrap='CJK',
+        leading=11
+    )
+    
+    report_styles['metadata_table'] = _label_table_style(valign_top=True)
+    report_styles['details_table'] = _label_table_style()
+    
+    # Results table highlights the status cell: green for Pass, dark yellow for Error, red otherwise
+    dark_yellow = colors.Color(0.8, 0.6, 0)  # Custom dark yellow color
+    report_styles['results_table'] = {}
+    for status, status_color in (('Pass', colors.green), ('Error', dark_yellow), ('Fail', colors.red)):
+        results_style = _label_table_style()
+        results_style.add('BACKGROUND', (1, 0), (1, 0), status_color)
+        results_style.add('TEXTCOLOR', (1, 0), (1, 0), colors.white)
+        report_styles['results_table'][status] = results_style
+    
+    report_styles['extra_table'] = TableStyle([
+        ('BACKGROUND', (0, 0), (0, 0), colors.lightgrey),
+        ('TEXTCOLOR', (0, 0), (0, 0), colors.black),
+        ('ALIGN', (0, 0), (0, 0), 'LEFT'),
+        ('VALIGN', (0, 0), (1, 0), 'TOP'),
+        ('FONTNAME', (0, 0), (0, 0), 'Helvetica'),
+        ('FONTSIZE', (0, 0), (1, 0), 10),
+        ('BOTTOMPADDING', (0, 0), (1, 0), 6),
+        ('GRID', (0, 0), (1, 0), 1, colors.black)
+    ])
+    
+    report_styles['column_table'] = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, -1), 9),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('BOTTOMPADDING', (0, 0), (-1, -1), 4),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ])
+    return report_styles
+
+def get_report_styles():
+    """Return the report styles, building them on first use in this process."""
+    global _report_styles
+    if _report_styles is None:
+        _report_styles = _build_report_styles()
+    return _report_styles
+
+def init_report_worker():
+    """Process pool initializer: build the report styles once per render worker."""
+    get_report_styles()
+
+def create_pdf_report(result, metadata):
+    """
+    Create a PDF report from test results data.
+    
+    Args:
+        result (TestResult): Test result object
+        metadata (RunMetadata): Run metadata object
+        
+    Returns:
+        bytes: PDF file content as bytes
+    """
+    # Create an in-memory buffer for the PDF
+    buffer = io.BytesIO()
+    
+    # Create the PDF document using ReportLab
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    report_styles = get_report_styles()
+    title_style = report_styles['title']
+    subtitle_style = report_styles['subtitle']
+    heading_style = report_styles['heading']
+    normal_style = report_styles['normal']
+    code_style = report_styles['code']
+    watermark_style = report_styles['watermark']
+    
     # Current timestamp for the "Generated" text
     current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
@@ -109,16 +199,7 @@ def create_pdf_report(result, metadata):
     ]
     
     metadata_table = Table(metadata_table, colWidths=[2*inch, 4*inch])
-    metadata_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-        ('TEXTCOLOR', (0, 0), (0, -1), colors.black),
-        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP')  # Align all cells to top for consistency
-    ]))
+    metadata_table.setStyle(report_styles['metadata_table'])
     elements.append(metadata_table)
     elements.append(Spacer(1, 0.25*inch))
     
@@ -141,17 +222,15 @@ def create_pdf_report(result, metadata):
         details.append(["Source Count", str(result.source_count)])
     if result.target_count not in ("NULL", None):
         details.append(["Target Count", str(result.target_count)])
+    if result.count_method != "N/A":
+        details.append(["Count Method (Source|Target)", result.count_method])
+    if result.source_only_count not in ("NULL", None):
+        details.append(["Source Only Rows", str(result.source_only_count)])
+    if result.target_only_count not in ("NULL", None):
+        details.append(["Target Only Rows", str(result.target_only_count)])
     
     details_table = Table(details, colWidths=[2*inch, 4*inch])
-    details_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-        ('TEXTCOLOR', (0, 0), (0, -1), colors.black),
-        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black)
-    ]))
+    details_table.setStyle(report_styles['details_table'])
     elements.append(details_table)
     elements.append(Spacer(1, 0.25*inch))
     
@@ -177,15 +256,6 @@ def create_pdf_report(result, metadata):
     # Add test results section
     elements.append(Paragraph("Test Results", heading_style))
     
-    # Define status color
-    dark_yellow = colors.Color(0.8, 0.6, 0)  # Custom dark yellow color
-    
-    status_color = (
-        colors.green if result.status == 'Pass' 
-        else dark_yellow if result.status == 'Error' 
-        else colors.red
-    )
-    
     results = [
         ["Status", result.status],
         ["Expected Result", result.expected_result],
@@ -203,49 +273,41 @@ def create_pdf_report(result, metadata):
     
     # First create the main results table
     results_table = Table(results, colWidths=[2*inch, 4*inch])
-    results_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-        ('TEXTCOLOR', (0, 0), (0, -1), colors.black),
-        ('ALIGN', (0, 0), (0, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BOTTOMPADDING', (0, 0), (-1, -1), 6),
-        ('GRID', (0, 0), (-1, -1), 1, colors.black),
-        ('BACKGROUND', (1, 0), (1, 0), status_color),
-        ('TEXTCOLOR', (1, 0), (1, 0), colors.white)
-    ]))
+    results_table.setStyle(report_styles['results_table'].get(result.status, report_styles['results_table']['Fail']))
     elements.append(results_table)
     elements.append(Spacer(1, 0.1*inch))
     
     # Create separate tables for error description and file path if they exist
     # This allows for better wrapping of long text
     for label, value in additional_rows:
-        # Create a paragraph style for potential long text
-        long_text_style = ParagraphStyle(
-            'LongText',
-            parent=styles['Normal'],
-            fontSize=10,
-            wordWrap='CJK',
-            leading=12
-        )
-        
         # Create a paragraph object for the value to enable wrapping
-        value_paragraph = Paragraph(value, long_text_style)
+        value_paragraph = Paragraph(value, report_styles['long_text'])
         
         # Add a table with just this row
         extra_table = Table([[label, value_paragraph]], colWidths=[2*inch, 4*inch])
-        extra_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, 0), colors.lightgrey),
-            ('TEXTCOLOR', (0, 0), (0, 0), colors.black),
-            ('ALIGN', (0, 0), (0, 0), 'LEFT'),
-            ('VALIGN', (0, 0), (1, 0), 'TOP'),
-            ('FONTNAME', (0, 0), (0, 0), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (1, 0), 10),
-            ('BOTTOMPADDING', (0, 0), (1, 0), 6),
-            ('GRID', (0, 0), (1, 0), 1, colors.black)
-        ]))
+        extra_table.setStyle(report_styles['extra_table'])
         elements.append(extra_table)
-    
+
+    # Add column level differences for keyed data checks
+    if result.column_differences:
+        elements.append(Spacer(1, 0.25*inch))
+        elements.append(Paragraph("Column Differences", heading_style))
+
+        cell_style = report_styles['cell']
+
+        # Paragraph parses its text as markup: labels such as "<key only in source>" and key values are escaped
+        column_rows = [["Column", "Differing Rows", "Example Keys"]]
+        for column, diff_count, example_keys in result.column_differences:
+            column_rows.append([
+                Paragraph(escape(str(column)), cell_style),
+                str(diff_count),
+                Paragraph(escape(", ".join(str(key) for key in example_keys)) or "-", cell_style)
+            ])
+
+        column_table = Table(column_rows, colWidths=[2*inch, 1.2*inch, 2.8*inch], repeatRows=1)
+        column_table.setStyle(report_styles['column_table'])
+        elements.append(column_table)
+
     # Build the PDF
     doc.build(elements)
     
@@ -0,0 +1,148 @@
+"""Run profiling: Chrome/Perfetto trace-event timelines and a sampling stack profiler."""
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from config.config import PROFILE_SAMPLE_INTERVAL_MS
+
+class TraceRecorder:
+    """
+    Collects trace events in the Chrome trace-event format (viewable in Perfetto or chrome://tracing).
+
+    Spans are recorded as complete ("X") events on the thread that ran them, so
+    every worker thread gets its own lane. Timestamps are perf_counter based,
+    relative to the moment the recorder was created.
+    """
+
+    def __init__(self):
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+        self._events = []
+        self._thread_names = {}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _micros(self, seconds):
+        return round((seconds - self._origin) * 1_000_000, 1)
+
+    def _current_lane(self):
+        """Lane ID of the calling thread. Thread idents are reused once a thread exits, so lanes are numbered here."""
+        lane = getattr(self._local, "lane", None)
+        if lane is None:
+            with self._lock:
+                lane = self._local.lane = len(self._thread_names) + 1
+                self._thread_names[(self._pid, lane)] = threading.current_thread().name
+        return lane
+
+    def complete(self, name, category, start, end, args=None, pid=None, tid=None, thread_name=None):
+        """
+        Record a span that ran from `start` to `end` (perf_counter seconds).
+
+        By default the span is placed on the calling thread; spans measured
+        elsewhere (e.g. a report rendered in a worker process) pass their own
+        pid/tid and a lane name.
+        """
+        if tid is None:
+            tid = self._current_lane()
+        event = {
+            "name": name, "cat": category, "ph": "X",
+            "ts": self._micros(start), "dur": round((end - start) * 1_000_000, 1),
+            "pid": pid or self._pid, "tid": tid,
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            self._events.append(event)
+            if (event["pid"], tid) not in self._thread_names:
+                self._thread_names[(event["pid"], tid)] = thread_name or str(tid)
+
+    def write(self, path):
+        """Write the collected events, plus process and thread names, as a trace-event JSON file."""
+        with self._lock:
+            events = list(self._events)
+            thread_names = dict(self._thread_names)
+        metadata = [{"name": "process_name", "ph": "M", "pid": self._pid, "args": {"name": "ETL test run"}}]
+        for (pid, tid), thread_name in thread_names.items():
+            metadata.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": thread_name}})
+            if pid != self._pid:
+                metadata.append({"name": "process_name", "ph": "M", "pid": pid, "args": {"name": thread_name}})
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"traceEvents": metadata + events, "displayTimeUnit": "ms"}, f)
+
+class StackSampler:
+    """
+    Sampling profiler: records the Python stack of every thread at a fixed interval.
+
+    Samples are wall-clock based, so threads blocked on I/O or locks show up in
+    their waiting frame; that is where Snowflake round trips appear. Stacks are
+    written in the folded format read by speedscope and flamegraph.pl.
+    """
+
+    def __init__(self, interval_ms=PROFILE_SAMPLE_INTERVAL_MS):
+        self.interval = max(1, interval_ms) / 1000
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        own_ident = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(thread_names.get(ident, str(ident)))
+                self.samples[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def write_folded(self, path):
+        """Write one 'thread;outer;...;inner count' line per distinct stack."""
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{stack} {count}\n")
+
+# Run-wide recorder; None means profiling is off and trace_span costs one global lookup
+_trace_recorder = None
+
+def enable_tracing():
+    """Record trace events for the rest of the run."""
+    global _trace_recorder
+    _trace_recorder = TraceRecorder()
+    return _trace_recorder
+
+def get_trace_recorder():
+    """Return the active TraceRecorder, or None when profiling is off."""
+    return _trace_recorder
+
+@contextmanager
+def trace_span(name, category, **args):
+    """
+    Record the with-block as a span on the calling thread when tracing is enabled.
+
+    Yields a dict of span arguments the block can still add to (e.g. a test's status).
+    """
+    if _trace_recorder is None:
+        yield args
+        return
+    start = time.perf_counter()
+    try:
+        yield args
+    finally:
+        _trace_recorder.complete(name, category, start, time.perf_counter(), args)
@@ -1,7 +1,135 @@
 """Query utility functions for ETL testing."""
+import re
 
 def clean_query(query):
     """Clean and prepare query for execution."""
     if not query:
         return ""
-    return query.strip(";")  # Remove trailing semicolon
\ No newline at end of file
+    return query.strip(";")  # Remove trailing semicolon
+
+def split_minus_query(minus_query):
+    """
+    Split "SELECT ... FROM A MINUS SELECT ... FROM B" into its source and target SELECT.
+
+    MINUS is matched case-insensitively and the text keeps its case, so string
+    literals and quoted identifiers in either SELECT are left untouched.
+
+    Returns:
+        tuple: (source_query, target_query), or None when the query has no MINUS
+    """
+    parts = re.split(r"\bMINUS\b", minus_query, maxsplit=1, flags=re.IGNORECASE)
+    if len(parts) < 2:
+        return None
+    return parts[0].strip(), parts[1].strip()
+
+def select_column_list(query):
+    """Return the column list of a SELECT (the text between SELECT and FROM), or None without a FROM."""
+    select_from_parts = re.split(r"\bFROM\b", query, maxsplit=1, flags=re.IGNORECASE)
+    if len(select_from_parts) < 2:
+        return None
+    return re.sub(r"^\s*SELECT\b", "", select_from_parts[0], count=1, flags=re.IGNORECASE).strip()
+
+def build_fingerprint_query(source_query, target_query):
+    """
+    Build one query returning the row count and order-independent HASH_AGG of both sides.
+
+    Equal fingerprints mean source and target hold the same rows, so the
+    expensive MINUS comparison can be skipped.
+    """
+    return f"""
+        SELECT S.ROW_COUNT AS SOURCE_ROWS, S.FINGERPRINT AS SOURCE_FINGERPRINT,
+               T.ROW_COUNT AS TARGET_ROWS, T.FINGERPRINT AS TARGET_FINGERPRINT
+        FROM (SELECT COUNT(*) AS ROW_COUNT, HASH_AGG(*) AS FINGERPRINT FROM ({source_query})) AS S
+        CROSS JOIN (SELECT COUNT(*) AS ROW_COUNT, HASH_AGG(*) AS FINGERPRINT FROM ({target_query})) AS T
+    """
+
+def bucket_expression(bucket_key, bucket_count):
+    """SQL expression assigning a row to one of `bucket_count` buckets by hashing its key column(s)."""
+    return f"MOD(ABS(HASH({bucket_key})), {int(bucket_count)})"
+
+def build_bucket_diff_query(source_query, target_query, bucket_key, bucket_count):
+    """
+    Build a query listing the buckets whose row count or HASH_AGG differs between source and target.
+
+    Rows are hashed into buckets by `bucket_key`; a bucket present on one side only is also reported.
+    """
+    bucket = bucket_expression(bucket_key, bucket_count)
+    return f"""
+        WITH S AS (
+            SELECT {bucket} AS BUCKET, COUNT(*) AS ROW_COUNT, HASH_AGG(*) AS FINGERPRINT
+            FROM ({source_query}) GROUP BY 1
+        ),
+        T AS (
+            SELECT {bucket} AS BUCKET, COUNT(*) AS ROW_COUNT, HASH_AGG(*) AS FINGERPRINT
+            FROM ({target_query}) GROUP BY 1
+        )
+        SELECT COALESCE(S.BUCKET, T.BUCKET) AS BUCKET
+        FROM S FULL OUTER JOIN T ON S.BUCKET = T.BUCKET
+        WHERE S.BUCKET IS NULL OR T.BUCKET IS NULL
+           OR S.ROW_COUNT <> T.ROW_COUNT OR S.FINGERPRINT <> T.FINGERPRINT
+        ORDER BY 1
+    """
+
+def restrict_to_buckets(query, bucket_key, bucket_count, buckets):
+    """Wrap a query so it only returns rows falling into the given buckets."""
+    bucket_list = ", ".join(str(int(b)) for b in buckets)
+    return f"SELECT * FROM ({query}) WHERE {bucket_expression(bucket_key, bucket_count)} IN ({bucket_list})"
+
+def split_column_list(column_list):
+    """
+    Split a SELECT column list on top-level commas and return the output column names.
+
+    Aliases ("expr AS NAME") resolve to the alias and qualified names ("T.COL") to the column.
+    """
+    items, depth, current = [], 0, ""
+    for char in column_list:
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        if char == "," and depth == 0:
+            items.append(current)
+            current = ""
+        else:
+            current += char
+    items.append(current)
+
+    names = []
+    for item in items:
+        item = item.strip()
+        if not item:
+            continue
+        name = re.split(r"\s+AS\s+", item, flags=re.IGNORECASE)[-1].strip().split(".")[-1]
+        names.append(name)
+    return names
+
+def build_column_diff_query(source_query, target_query, key_columns, compare_columns):
+    """
+    Build a single aggregate query joining source and target on the key columns.
+
+    Returns one row with SOURCE_ONLY / TARGET_ONLY key counts and, per compared
+    column, the number of matched keys whose values differ (<COL>_DIFF) plus the
+    smallest and largest differing key (<COL>_MIN_KEY / <COL>_MAX_KEY) as examples.
+    """
+    join_condition = " AND ".join(f"S.{key} = T.{key}" for key in key_columns)
+    key_text = " || '|' || ".join(f"COALESCE(TO_VARCHAR(S.{key}), '')" for key in key_columns)
+    first_key = key_columns[0]
+
+    aggregates = [
+        f"COUNT_IF(T.{first_key} IS NULL) AS SOURCE_ONLY",
+        f"COUNT_IF(S.{first_key} IS NULL) AS TARGET_ONLY",
+    ]
+    for index, column in enumerate(compare_columns):
+        differs = (f"S.{first_key} IS NOT NULL AND T.{first_key} IS NOT NULL "
+                   f"AND NOT EQUAL_NULL(S.{column}, T.{column})")
+        aggregates.append(f"COUNT_IF({differs}) AS C{index}_DIFF")
+        aggregates.append(f"MIN(CASE WHEN {differs} THEN {key_text} END) AS C{index}_MIN_KEY")
+        aggregates.append(f"MAX(CASE WHEN {differs} THEN {key_text} END) AS C{index}_MAX_KEY")
+
+    select_list = ",\n               ".join(aggregates)
+    return f"""
+        SELECT {select_list}
+        FROM ({source_query}) AS S
+        FULL OUTER JOIN ({target_query}) AS T
+        ON {join_condition}
+    """
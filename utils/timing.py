@@ -0,0 +1,29 @@
+"""Per-phase timing of test execution."""
+import time
+from contextlib import contextmanager
+
+from utils.profiling import get_trace_recorder
+
+# Phases recorded per test in TestResult.phase_timings and TEST_LOGS.<PHASE>_TIME
+PHASES = ("source_query", "target_query", "refresh_check", "diff_query", "export", "render", "upload", "log")
+
+@contextmanager
+def timed_phase(timings, phase):
+    """
+    Add the wall-clock seconds spent in the with-block to `timings[phase]`.
+
+    A phase entered several times (e.g. the fingerprint, bucket and column
+    diff queries of one data check) accumulates. `timings` may be None, in
+    which case nothing is recorded. With profiling enabled every entry is
+    also recorded as a span on the trace timeline.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        if timings is not None:
+            timings[phase] = timings.get(phase, 0.0) + end - start
+        trace_recorder = get_trace_recorder()
+        if trace_recorder is not None:
+            trace_recorder.complete(phase, "phase", start, end)